@@ -1,54 +1,109 @@
-from fastapi import FastAPI
-from fastapi.exceptions import ResponseValidationError
-from pydantic import ValidationError
-from starlette import status
-
-from app.auth.authentication.exceptions import (
-    AuthenticationError,
-    NotEnoughPermissionError,
-    PasswordError,
-    TokenDataError,
-)
-from app.auth.authentication.routes import auth
-from app.auth.config import settings
-from app.auth.database.exceptions import (
-    DatabaseInsertionError,
-    DocumentNotFound,
-    db_exception_handler,
-)
-from app.auth.exceptions import (
-    ExceptionHandlersAlias,
-    exception_handler,
-    pydantic_validation_exception_handler,
-)
-from app.auth.users.profiles.routes import profiles
-from app.auth.users.routes import users
-from app.auth.verification.exceptions import VerificationError
-from app.auth.verification.routes import verification
-
-exception_handlers: ExceptionHandlersAlias = {
-    AuthenticationError: exception_handler,
-    VerificationError: exception_handler,
-    ValidationError: pydantic_validation_exception_handler,
-    ResponseValidationError: pydantic_validation_exception_handler,
-    PasswordError: exception_handler,
-    TokenDataError: exception_handler,
-    NotEnoughPermissionError: exception_handler,
-    DocumentNotFound: db_exception_handler,
-    DatabaseInsertionError: db_exception_handler,
-}
-
-app = FastAPI(
-    exception_handlers=exception_handlers,
-    openapi_url="/openapi.json" if settings.debug else "",
-)
-
-app.include_router(users)
-app.include_router(auth)
-app.include_router(verification)
-app.include_router(profiles)
-
-
-@app.get("/health-check", status_code=status.HTTP_204_NO_CONTENT)
-async def health_check() -> None:
-    return None
+from contextlib import asynccontextmanager
+from hmac import compare_digest
+from typing import Annotated, AsyncIterator
+
+from fastapi import FastAPI, Header
+from fastapi.exceptions import ResponseValidationError
+from pydantic import ValidationError
+from starlette import status
+from starlette.responses import PlainTextResponse
+
+from app.auth.authentication.exceptions import (
+    AuthenticationError,
+    HashingQueueFullError,
+    NotEnoughPermissionError,
+    PasswordError,
+    TokenDataError,
+)
+from app.auth.authentication.routes import auth, well_known
+from app.auth.authentication.utils import password_hasher
+from app.auth.config import config
+from app.auth.database.exceptions import (
+    DatabaseInsertionError,
+    DocumentNotFound,
+    db_exception_handler,
+)
+from app.auth.database.services import db
+from app.auth.exceptions import (
+    ExceptionHandlersAlias,
+    exception_handler,
+    pydantic_validation_exception_handler,
+)
+from app.auth.mail.services import outbox_worker, smtp_pool
+from app.auth.metrics import (
+    MetricsMiddleware,
+    count_exceptions,
+    render_metrics,
+)
+from app.auth.users.profiles.routes import profiles
+from app.auth.users.routes import users
+from app.auth.verification.exceptions import VerificationError
+from app.auth.verification.routes import verification
+
+exception_handlers: ExceptionHandlersAlias = {
+    AuthenticationError: exception_handler,
+    VerificationError: exception_handler,
+    ValidationError: pydantic_validation_exception_handler,
+    ResponseValidationError: pydantic_validation_exception_handler,
+    PasswordError: exception_handler,
+    HashingQueueFullError: exception_handler,
+    TokenDataError: exception_handler,
+    NotEnoughPermissionError: exception_handler,
+    DocumentNotFound: db_exception_handler,
+    DatabaseInsertionError: db_exception_handler,
+}
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    await db.create_indexes()
+    outbox_worker.start()
+    yield
+    await outbox_worker.stop()
+    await smtp_pool.close()
+    password_hasher.shutdown()
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    exception_handlers={
+        exception: count_exceptions(handler)
+        for exception, handler in exception_handlers.items()
+    },
+    openapi_url="/openapi.json" if config.debug else "",
+)
+app.add_middleware(MetricsMiddleware)
+
+app.include_router(users)
+app.include_router(auth)
+app.include_router(verification)
+app.include_router(profiles)
+app.include_router(well_known)
+
+
+@app.get("/health-check", status_code=status.HTTP_204_NO_CONTENT)
+async def health_check() -> None:
+    return None
+
+
+if config.monitoring.metrics_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(
+        authorization: Annotated[str, Header()] = ""
+    ) -> PlainTextResponse:
+        """
+        Metrics of this worker process in the Prometheus text format.
+        The bearer token is required if it is set
+        """
+        if token := config.monitoring.metrics_token:
+            if not compare_digest(
+                authorization.encode(), f"Bearer {token}".encode()
+            ):
+                raise TokenDataError(
+                    "Invalid metrics token.", status.HTTP_401_UNAUTHORIZED
+                )
+
+        return PlainTextResponse(
+            render_metrics(), media_type="text/plain; version=0.0.4"
+        )
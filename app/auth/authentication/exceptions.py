@@ -1,17 +1,21 @@
-from app.auth.exceptions import BaseAuthException
-
-
-class AuthenticationError(BaseAuthException):
-    pass
-
-
-class TokenDataError(AuthenticationError):
-    pass
-
-
-class PasswordError(AuthenticationError):
-    pass
-
-
-class NotEnoughPermissionError(AuthenticationError):
-    pass
+from app.auth.exceptions import BaseAuthException
+
+
+class AuthenticationError(BaseAuthException):
+    pass
+
+
+class TokenDataError(AuthenticationError):
+    pass
+
+
+class PasswordError(AuthenticationError):
+    pass
+
+
+class NotEnoughPermissionError(AuthenticationError):
+    pass
+
+
+class HashingQueueFullError(AuthenticationError):
+    pass
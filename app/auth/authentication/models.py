@@ -1,33 +1,58 @@
-from pydantic import BaseModel, ConfigDict, EmailStr
-
-from app.auth.database.types import PyObjectId
-from app.auth.models import BaseDocument, Collection
-
-
-class BaseAuthData(BaseModel):
-    username: str
-    password: str
-
-    model_config = ConfigDict(extra="forbid")
-
-
-class SignupData(BaseAuthData):
-    email: EmailStr
-
-
-class LoginData(BaseAuthData):
-    pass
-
-
-class Authorization(BaseDocument):
-    """
-    Authorization model is used to keep and control refresh tokens.
-    After user is logout, document with token will be deleted
-    """
-
-    user_id: PyObjectId
-    refresh_token: str
-
-    @classmethod
-    def collection(cls) -> str:
-        return Collection.authorizations
+import hashlib
+from datetime import UTC, datetime, timedelta
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pymongo import IndexModel
+
+from app.auth.config import config
+from app.auth.database.types import PyObjectId
+from app.auth.models import BaseDocument, Collection
+
+
+class BaseAuthData(BaseModel):
+    username: str
+    password: str
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class SignupData(BaseAuthData):
+    email: EmailStr
+
+
+class LoginData(BaseAuthData):
+    pass
+
+
+def refresh_token_exp_date() -> datetime:
+    return datetime.now(UTC) + timedelta(
+        minutes=config.auth.refresh_token_exp_minutes
+    )
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+class Authorization(BaseDocument):
+    """
+    Authorization model is used to keep and control refresh tokens.
+    Only SHA-256 digest of the token is stored to keep the index small.
+    After user is logout, document with token will be deleted,
+    abandoned ones are removed by the TTL index when the token expires
+    """
+
+    user_id: PyObjectId
+    refresh_token_digest: bytes
+    exp_date: datetime = Field(default_factory=refresh_token_exp_date)
+
+    @classmethod
+    def collection(cls) -> str:
+        return Collection.authorizations
+
+    @classmethod
+    def indexes(cls) -> list[IndexModel]:
+        return [
+            IndexModel("refresh_token_digest"),
+            IndexModel("exp_date", expireAfterSeconds=0),
+        ]
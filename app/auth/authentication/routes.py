@@ -1,37 +1,68 @@
-from typing import Annotated
-
-from fastapi import APIRouter, Body
-from starlette import status
-
-from app.auth.authentication.models import LoginData, SignupData
-from app.auth.authentication.services import login_user, signup_user
-from app.auth.authentication.tokens.models import TokenPair
-from app.auth.authentication.tokens.services import (
-    delete_authorization,
-    refresh_token_pair,
-)
-from app.auth.verification.models import VerificationOut
-
-auth = APIRouter(prefix="/auth", tags=["Authentication"])
-
-
-@auth.post("/signup")
-async def signup(signin: SignupData) -> VerificationOut:
-    return await signup_user(signin)
-
-
-@auth.post("/login")
-async def login(login_data: LoginData) -> TokenPair:
-    return await login_user(**login_data.model_dump())
-
-
-@auth.post("/logout", status_code=status.HTTP_401_UNAUTHORIZED)
-async def logout(refresh_token: Annotated[str, Body(embed=True)]) -> None:
-    await delete_authorization(refresh_token)
-
-
-@auth.post("/refresh")
-async def refresh(
-    refresh_token: Annotated[str, Body(embed=True)]
-) -> TokenPair:
-    return await refresh_token_pair(refresh_token)
+from typing import Annotated
+
+from fastapi import APIRouter, Body, Security
+from starlette import status
+from starlette.responses import JSONResponse
+
+from app.auth.authentication.models import LoginData, SignupData
+from app.auth.authentication.services import login_user, signup_user
+from app.auth.authentication.tokens.keys import key_set
+from app.auth.authentication.tokens.models import TokenIntrospection, TokenPair
+from app.auth.authentication.tokens.services import (
+    delete_authorization,
+    get_token_data,
+    introspect_tokens,
+    refresh_token_pair,
+)
+from app.auth.config import config
+from app.auth.verification.models import VerificationOut
+
+auth = APIRouter(prefix="/auth", tags=["Authentication"])
+well_known = APIRouter(prefix="/.well-known", tags=["Authentication"])
+
+
+@auth.post("/signup")
+async def signup(signin: SignupData) -> VerificationOut:
+    return await signup_user(signin)
+
+
+@auth.post("/login")
+async def login(login_data: LoginData) -> TokenPair:
+    return await login_user(**login_data.model_dump())
+
+
+@auth.post("/logout", status_code=status.HTTP_401_UNAUTHORIZED)
+async def logout(refresh_token: Annotated[str, Body(embed=True)]) -> None:
+    await delete_authorization(refresh_token)
+
+
+@auth.post("/refresh")
+async def refresh(
+    refresh_token: Annotated[str, Body(embed=True)]
+) -> TokenPair:
+    return await refresh_token_pair(refresh_token)
+
+
+@auth.post(
+    "/introspect",
+    dependencies=[Security(get_token_data, scopes=["admin"])],
+)
+async def introspect(
+    tokens: Annotated[
+        list[str],
+        Body(embed=True, max_length=config.auth.introspection_max_tokens),
+    ]
+) -> list[TokenIntrospection]:
+    """Validate a batch of tokens, for gateways with an admin token"""
+    return await introspect_tokens(tokens)
+
+
+@well_known.get("/jwks.json")
+async def jwks() -> JSONResponse:
+    """Public keys for other services to verify tokens locally"""
+    return JSONResponse(
+        key_set.jwks(),
+        headers={
+            "Cache-Control": f"public, max-age={config.auth.jwks_max_age}"
+        },
+    )
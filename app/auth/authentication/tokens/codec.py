@@ -0,0 +1,118 @@
+import json
+from datetime import datetime, timezone
+from typing import Any
+
+from jwt import (
+    DecodeError,
+    ExpiredSignatureError,
+    InvalidAlgorithmError,
+    InvalidSignatureError,
+)
+from jwt.algorithms import get_default_algorithms
+from jwt.utils import base64url_decode, base64url_encode
+
+from app.auth.authentication.tokens.keys import KeySet, key_set
+from app.auth.authentication.tokens.models import (
+    BaseTokenData,
+    TokenData,
+    TokenType,
+)
+
+
+def _encode_segment(data: dict[str, Any], sort_keys: bool = False) -> bytes:
+    return base64url_encode(
+        json.dumps(data, separators=(",", ":"), sort_keys=sort_keys).encode()
+    )
+
+
+class TokenCodec:
+    """
+    JWS compact serialization of the service claim set.
+    The encoded header and the signing key are prepared once,
+    the claims are serialized directly and validated by TokenData
+    from JSON, skipping the generic PyJWT claim handling.
+    Tokens are byte-for-byte the same as jwt.encode produces,
+    tokens of other JWT libraries are decoded by parsing the header
+    """
+
+    def __init__(self, key_set: KeySet) -> None:
+        self.key_set = key_set
+        self.algorithm = get_default_algorithms()[key_set.algorithm]
+
+        # PyJWT sorts header keys, so the header segments are equal
+        self.header = _encode_segment(
+            {"alg": key_set.algorithm, "typ": "JWT"} | (key_set.headers or {}),
+            sort_keys=True,
+        )
+        self.verification_keys: dict[bytes, Any] = {
+            _encode_segment(
+                {"alg": key_set.algorithm, "typ": "JWT"}
+                | ({"kid": key_id} if key_id else {}),
+                sort_keys=True,
+            ): key
+            for key_id, key in key_set.verification_keys.items()
+        }
+
+    def encode(
+        self, data: BaseTokenData, token_type: TokenType, exp: datetime
+    ) -> str:
+        payload = _encode_segment(
+            {
+                "user_id": data.user_id,
+                "scopes": data.scopes,
+                "token_type": token_type,
+                "exp": int(exp.timestamp()),
+            }
+        )
+        signing_input = self.header + b"." + payload
+        signature = self.algorithm.sign(
+            signing_input, self.key_set.signing_key
+        )
+        return (signing_input + b"." + base64url_encode(signature)).decode()
+
+    def verification_key(self, header: bytes) -> Any:
+        if (key := self.verification_keys.get(header)) is not None:
+            return key
+
+        try:
+            header_data = json.loads(base64url_decode(header))
+        except ValueError as error:
+            raise DecodeError(f"Invalid header padding: {error}")
+        if not isinstance(header_data, dict):
+            raise DecodeError("Invalid header string: must be a json object")
+        if header_data.get("alg") != self.key_set.algorithm:
+            raise InvalidAlgorithmError(
+                "The specified alg value is not allowed"
+            )
+
+        return self.key_set.verification_key(header_data.get("kid"))
+
+    def decode(self, token: str) -> TokenData:
+        """
+        Verify the signature and the expiration of the token.
+        Return the token data or raise a PyJWT or pydantic error
+        """
+        signing_input, _, signature = token.encode().rpartition(b".")
+        header, _, payload = signing_input.partition(b".")
+        if not header or not payload:
+            raise DecodeError("Not enough segments")
+
+        try:
+            signature_bytes = base64url_decode(signature)
+            payload_bytes = base64url_decode(payload)
+        except ValueError:
+            raise DecodeError("Invalid crypto padding")
+
+        if not self.algorithm.verify(
+            signing_input, self.verification_key(header), signature_bytes
+        ):
+            raise InvalidSignatureError("Signature verification failed")
+
+        token_data = TokenData.model_validate_json(payload_bytes)
+        if token_data.exp <= datetime.now(timezone.utc):
+            raise ExpiredSignatureError("Signature has expired")
+
+        return token_data
+
+
+token_codec = TokenCodec(key_set)
@@ -0,0 +1,89 @@
+from typing import Any
+
+from jwt.algorithms import get_default_algorithms
+
+from app.auth.config import config
+
+
+class KeySet:
+    """
+    Keys to sign and verify tokens.
+    HMAC algorithms use the secret key, the keys are not published.
+    Asymmetric algorithms (RS256, EdDSA, ...) use PEM keys by "kid":
+    tokens are signed by the private key of the active "kid",
+    every configured key verifies them, so a key can be rotated
+    by keeping the old public key until its tokens expire
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        secret_key: str | None = None,
+        keys: dict[str, str] | None = None,
+        active_key_id: str | None = None,
+    ) -> None:
+        algorithms = get_default_algorithms()
+        if algorithm not in algorithms or algorithm == "none":
+            raise ValueError(f"Unsupported signing algorithm {algorithm!r}.")
+
+        self.algorithm = algorithm
+        self._algorithm = algorithms[algorithm]
+
+        if algorithm.startswith("HS"):
+            if not secret_key:
+                raise ValueError("The secret key is required for HMAC.")
+            self.key_id: str | None = None
+            self.signing_key: Any = self._algorithm.prepare_key(secret_key)
+            self.verification_keys: dict[str | None, Any] = {
+                None: self.signing_key
+            }
+            return
+
+        prepared_keys = {
+            key_id: self._algorithm.prepare_key(pem)
+            for key_id, pem in (keys or {}).items()
+        }
+        if active_key_id not in prepared_keys or not hasattr(
+            prepared_keys[active_key_id], "public_key"
+        ):
+            raise ValueError(
+                f"The private key {active_key_id!r} is required for signing."
+            )
+
+        self.key_id = active_key_id
+        self.signing_key = prepared_keys[active_key_id]
+        self.verification_keys = {
+            key_id: key.public_key() if hasattr(key, "public_key") else key
+            for key_id, key in prepared_keys.items()
+        }
+
+    @property
+    def headers(self) -> dict[str, str] | None:
+        return {"kid": self.key_id} if self.key_id else None
+
+    def verification_key(self, key_id: str | None) -> Any:
+        """Return the key to verify a token with the "kid" header"""
+        if key_id not in self.verification_keys:
+            raise ValueError(f"Unknown signing key {key_id!r}.")
+        return self.verification_keys[key_id]
+
+    def jwks(self) -> dict[str, list[dict[str, Any]]]:
+        """Public keys as JSON Web Key Set, empty for HMAC"""
+        keys = []
+        for key_id, key in self.verification_keys.items():
+            if key_id is None:
+                continue
+            jwk = self._algorithm.to_jwk(key, as_dict=True)
+            keys.append(
+                jwk | {"kid": key_id, "alg": self.algorithm, "use": "sig"}
+            )
+
+        return {"keys": keys}
+
+
+key_set = KeySet(
+    config.auth.signing_algorithm,
+    config.secret_key,
+    config.signing_keys,
+    config.auth.signing_key_id,
+)
@@ -1,158 +1,234 @@
-from datetime import datetime, timedelta, timezone
-from typing import Annotated
-
-import jwt
-from bson import ObjectId
-from fastapi import Depends
-from fastapi.security import (
-    HTTPAuthorizationCredentials,
-    HTTPBearer,
-    SecurityScopes,
-)
-from jwt import ExpiredSignatureError
-from starlette import status
-
-from app.auth.authentication.exceptions import (
-    NotEnoughPermissionError,
-    TokenDataError,
-)
-from app.auth.authentication.models import Authorization
-from app.auth.authentication.tokens.models import (
-    BaseTokenData,
-    TokenData,
-    TokenPair,
-    TokenType,
-)
-from app.auth.config import settings
-from app.auth.database.services import db
-from app.auth.users.models import User
-
-status_401 = status.HTTP_401_UNAUTHORIZED
-
-
-def create_token(
-    data: BaseTokenData, token_type: TokenType, expires_in: int
-) -> str:
-    """
-    Create token includes "user_id", "scopes", "token_type", and "expires_in"
-    Encode and return token as a string
-    """
-    token_data = TokenData(
-        **data.model_dump(),
-        token_type=token_type,
-        exp=datetime.now(timezone.utc) + timedelta(minutes=expires_in),
-    )
-    token: str = jwt.encode(
-        token_data.model_dump(),
-        settings.secret_key,
-        algorithm=settings.auth.signing_algorithm,
-    )
-    return token
-
-
-def create_token_pair(data: BaseTokenData) -> TokenPair:
-    """
-    Create access and refresh tokens.
-    Return TokenPair instance.
-    """
-    access_token = create_token(
-        data, TokenType.access, settings.auth.access_token_exp_minutes
-    )
-    refresh_token = create_token(
-        data, TokenType.refresh, settings.auth.refresh_token_exp_minutes
-    )
-
-    return TokenPair(access_token=access_token, refresh_token=refresh_token)
-
-
-def decode_token(token: str) -> TokenData:
-    """
-    Decode token and return TokenData instance includes
-    "user_id", "scopes", "token_type", and "expires_in"
-    """
-    try:
-        token_data = TokenData(
-            **jwt.decode(
-                token,
-                settings.secret_key,
-                algorithms=[settings.auth.signing_algorithm],
-            )
-        )
-    except ExpiredSignatureError:
-        raise TokenDataError("Signature has expired.", status_401)
-    except Exception as error:
-        raise TokenDataError(str(error), status_401)
-
-    return token_data
-
-
-def get_token_data(
-    security_scopes: SecurityScopes,
-    credentials: Annotated[
-        HTTPAuthorizationCredentials, Depends(HTTPBearer())
-    ],
-) -> TokenData:
-    """
-    Get token from header and call decode func.
-    Check credentials against security scopes and verify token type.
-    Return the token data instance if valid.
-    """
-    token_data = decode_token(credentials.credentials)
-
-    if token_data.token_type != TokenType.access:
-        raise TokenDataError("Invalid token type.", status_401)
-
-    for scope in security_scopes.scopes:
-        if scope in token_data.scopes:
-            return token_data
-
-    raise NotEnoughPermissionError("Not enough permissions.", status_401)
-
-
-async def refresh_token_pair(token: str) -> TokenPair:
-    """
-    Check the token is valid and its type is refresh.
-    Create and return a new token pair.
-    """
-    token_data = decode_token(token)
-    if token_data.token_type != TokenType.refresh:
-        raise TokenDataError("Invalid token type.", status_401)
-
-    user = await db.find(User, {"_id": ObjectId(token_data.user_id)}, True)
-
-    authorization = await db.find(
-        Authorization, {"refresh_token": token}, True
-    )
-
-    token_pair = create_token_pair(
-        BaseTokenData(user_id=user.id, scopes=user.roles)
-    )
-    authorization.refresh_token = token_pair.refresh_token
-    await db.replace(authorization)
-
-    return token_pair
-
-
-async def authenticate_user(user: User) -> TokenPair:
-    """
-    Create token data.
-    Insert authorization instance with refresh token into the database.
-    Return new token pair
-    """
-    token_data = BaseTokenData(user_id=user.id, scopes=user.roles)
-    token_pair = create_token_pair(token_data)
-
-    await db.insert(
-        Authorization(
-            user_id=ObjectId(user.id), refresh_token=token_pair.refresh_token
-        )
-    )
-    return token_pair
-
-
-async def delete_authorization(token: str) -> None:
-    """Find and delete authorization from database by refresh token"""
-    authorization = await db.find(
-        Authorization, {"refresh_token": token}, True
-    )
-    await db.delete(authorization)
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+
+from bson import ObjectId
+from fastapi import Depends
+from fastapi.security import (
+    HTTPAuthorizationCredentials,
+    HTTPBearer,
+    SecurityScopes,
+)
+from jwt import ExpiredSignatureError
+from starlette import status
+
+from app.auth.authentication.exceptions import (
+    NotEnoughPermissionError,
+    TokenDataError,
+)
+from app.auth.authentication.models import (
+    Authorization,
+    refresh_token_exp_date,
+    token_digest,
+)
+from app.auth.authentication.tokens.codec import token_codec
+from app.auth.authentication.tokens.models import (
+    BaseTokenData,
+    TokenData,
+    TokenIntrospection,
+    TokenPair,
+    TokenType,
+)
+from app.auth.cache import TTLCache
+from app.auth.config import config
+from app.auth.database.services import db
+from app.auth.metrics import token_duration
+from app.auth.users.models import User
+
+status_401 = status.HTTP_401_UNAUTHORIZED
+
+"""Already verified tokens by digest, kept until the token expires"""
+token_cache: TTLCache[bytes, TokenData] = TTLCache(
+    config.auth.token_cache_size,
+    config.auth.access_token_exp_minutes * 60,
+)
+
+
+@token_duration.time_sync("create")
+def create_token(
+    data: BaseTokenData, token_type: TokenType, expires_in: int
+) -> str:
+    """
+    Create token includes "user_id", "scopes", "token_type", and "expires_in"
+    Encode and return token as a string
+    """
+    return token_codec.encode(
+        data,
+        token_type,
+        datetime.now(timezone.utc) + timedelta(minutes=expires_in),
+    )
+
+
+def create_token_pair(data: BaseTokenData) -> TokenPair:
+    """
+    Create access and refresh tokens.
+    Return TokenPair instance.
+    """
+    access_token = create_token(
+        data, TokenType.access, config.auth.access_token_exp_minutes
+    )
+    refresh_token = create_token(
+        data, TokenType.refresh, config.auth.refresh_token_exp_minutes
+    )
+
+    return TokenPair(access_token=access_token, refresh_token=refresh_token)
+
+
+@token_duration.time_sync("decode")
+def decode_token(token: str) -> TokenData:
+    """
+    Decode token and return TokenData instance includes
+    "user_id", "scopes", "token_type", and "expires_in".
+    Verified tokens are cached until they expire
+    """
+    digest = token_digest(token)
+    if cached_token_data := token_cache.get(digest):
+        return cached_token_data
+
+    try:
+        token_data = token_codec.decode(token)
+    except ExpiredSignatureError:
+        raise TokenDataError("Signature has expired.", status_401)
+    except Exception as error:
+        raise TokenDataError(str(error), status_401)
+
+    token_cache.set(
+        digest,
+        token_data,
+        (token_data.exp - datetime.now(timezone.utc)).total_seconds(),
+    )
+    return token_data
+
+
+async def get_token_data(
+    security_scopes: SecurityScopes,
+    credentials: Annotated[
+        HTTPAuthorizationCredentials, Depends(HTTPBearer())
+    ],
+) -> TokenData:
+    """
+    Get token from header and call decode func.
+    Check credentials against security scopes and verify token type.
+    Return the token data instance if valid.
+    """
+    token_data = decode_token(credentials.credentials)
+
+    if token_data.token_type != TokenType.access:
+        raise TokenDataError("Invalid token type.", status_401)
+
+    for scope in security_scopes.scopes:
+        if scope in token_data.scopes:
+            return token_data
+
+    raise NotEnoughPermissionError("Not enough permissions.", status_401)
+
+
+async def introspect_tokens(tokens: list[str]) -> list[TokenIntrospection]:
+    """
+    Decode the tokens and check refresh tokens are not revoked
+    by one query for the whole batch.
+    Return results in the order of the tokens
+    """
+    results = []
+    refresh_digests = []
+    for token in tokens:
+        try:
+            token_data = decode_token(token)
+        except TokenDataError as error:
+            results.append(
+                TokenIntrospection(active=False, error=error.message)
+            )
+            continue
+
+        results.append(TokenIntrospection(active=True, token_data=token_data))
+        if token_data.token_type == TokenType.refresh:
+            refresh_digests.append(token_digest(token))
+
+    if not refresh_digests:
+        return results
+
+    authorized_digests = set(
+        await db.distinct(
+            Authorization,
+            "refresh_token_digest",
+            {"refresh_token_digest": {"$in": refresh_digests}},
+        )
+    )
+    for token, result in zip(tokens, results):
+        if (
+            result.token_data
+            and result.token_data.token_type == TokenType.refresh
+            and token_digest(token) not in authorized_digests
+        ):
+            result.active = False
+            result.error = "Token is revoked."
+
+    return results
+
+
+async def refresh_token_pair(token: str) -> TokenPair:
+    """
+    Check the token is valid and its type is refresh.
+    Create and return a new token pair.
+    The authorization is rotated by one update conditioned on the old token,
+    so the token can be used only once even by concurrent requests.
+    The new refresh token keeps the scopes of the old one,
+    so the rotation runs concurrently with reading the user roles
+    for the access token instead of after it
+    """
+    token_data = decode_token(token)
+    if token_data.token_type != TokenType.refresh:
+        raise TokenDataError("Invalid token type.", status_401)
+
+    refresh_token = create_token(
+        BaseTokenData(user_id=token_data.user_id, scopes=token_data.scopes),
+        TokenType.refresh,
+        config.auth.refresh_token_exp_minutes,
+    )
+    # The rotation raises DocumentNotFound if the token is already used,
+    # then the user is discarded
+    user, _ = await asyncio.gather(
+        db.get(User, token_data.user_id),
+        db.find_and_update(
+            Authorization,
+            {"refresh_token_digest": token_digest(token)},
+            {
+                "refresh_token_digest": token_digest(refresh_token),
+                "exp_date": refresh_token_exp_date(),
+            },
+            {"_id": True},
+        ),
+    )
+    access_token = create_token(
+        BaseTokenData(user_id=user.id, scopes=user.roles),
+        TokenType.access,
+        config.auth.access_token_exp_minutes,
+    )
+
+    return TokenPair(access_token=access_token, refresh_token=refresh_token)
+
+
+async def authenticate_user(user: User) -> TokenPair:
+    """
+    Create token data.
+    Insert authorization instance with refresh token into the database.
+    Return new token pair
+    """
+    token_data = BaseTokenData(user_id=user.id, scopes=user.roles)
+    token_pair = create_token_pair(token_data)
+
+    await db.insert(
+        Authorization(
+            user_id=ObjectId(user.id),
+            refresh_token_digest=token_digest(token_pair.refresh_token),
+        )
+    )
+    return token_pair
+
+
+async def delete_authorization(token: str) -> None:
+    """Find and delete authorization from database by refresh token"""
+    authorization = await db.find(
+        Authorization, {"refresh_token_digest": token_digest(token)}, True
+    )
+    await db.delete(authorization)
@@ -1,11 +1,123 @@
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+import asyncio
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Any, Callable, Iterable, TypeVar
+
+from passlib.context import CryptContext
+from starlette import status
+
+from app.auth.authentication.exceptions import HashingQueueFullError
+from app.auth.config import config
+from app.auth.metrics import password_hashing_duration
+
+T = TypeVar("T")
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """
+    Bounded worker pool to run bcrypt outside the event loop.
+    Threads are enough because bcrypt releases the GIL,
+    processes can be used instead by the "executor" setting.
+    Calls above the pending limit are rejected instead of queueing forever.
+    """
+
+    executors: dict[str, Callable[..., Executor]] = {
+        "thread": ThreadPoolExecutor,
+        "process": ProcessPoolExecutor,
+    }
+
+    def __init__(
+        self, executor: str, max_workers: int, max_pending: int
+    ) -> None:
+        if executor not in self.executors:
+            raise ValueError(f"Unknown hashing executor {executor!r}.")
+
+        self.executor_type = executor
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        """Create the pool on first use, so it is recreated after shutdown"""
+        if self._executor is None:
+            self._executor = self.executors[self.executor_type](
+                max_workers=self.max_workers
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Run the function in the pool.
+        Raise HashingQueueFullError if too many calls are already pending
+        """
+        if self.pending >= self.max_pending:
+            raise HashingQueueFullError(
+                "Too many password hashing requests.",
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, func, *args
+            )
+        finally:
+            self.pending -= 1
+
+    async def map(
+        self, func: Callable[[Any], T], items: Iterable[Any]
+    ) -> list[T]:
+        """
+        Run the function for every item in the pool.
+        At most max_workers items are submitted at a time,
+        so a large batch does not fill the pending limit of other calls
+        """
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def run_item(item: Any) -> T:
+            async with slots:
+                return await self.run(func, item)
+
+        return await asyncio.gather(*(run_item(item) for item in items))
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    config.hashing.executor,
+    config.hashing.max_workers,
+    config.hashing.max_pending,
+)
+
+
+@password_hashing_duration.time("verify")
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(_verify, plain_password, hashed_password)
+
+
+@password_hashing_duration.time("hash")
+async def hash_password(password: str) -> str:
+    return await password_hasher.run(_hash, password)
+
+
+@password_hashing_duration.time("hash_many")
+async def hash_passwords(passwords: list[str]) -> list[str]:
+    return await password_hasher.map(_hash, passwords)
@@ -1,6 +1,18 @@
 from pathlib import Path
+from typing import Any, Literal, Self, TypeVar
 
 from dynaconf import Dynaconf
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    NonNegativeFloat,
+    NonNegativeInt,
+    PositiveFloat,
+    PositiveInt,
+    model_validator,
+)
 
 root_path = Path(__file__).parent.parent.parent
 
@@ -9,3 +21,150 @@ settings = Dynaconf(
     envvar_prefix="AUTH",
     settings_files=[root_path / "settings.toml", root_path / ".secrets.toml"],
 )
+
+
+class FrozenConfig(BaseModel):
+    """The base model for the validated, immutable configuration"""
+
+    model_config = ConfigDict(frozen=True)
+
+
+class AuthConfig(FrozenConfig):
+    password_min_length: PositiveInt
+    signing_algorithm: str
+    signing_key_id: str = ""
+    jwks_max_age: NonNegativeInt
+    introspection_max_tokens: PositiveInt
+    access_token_exp_minutes: PositiveInt
+    refresh_token_exp_minutes: PositiveInt
+    verification_exp_minutes: PositiveInt
+    verification_resend_minutes: PositiveInt
+    # The code digits are sampled without repetition
+    verification_code_length: int = Field(ge=1, le=10)
+    token_cache_size: NonNegativeInt
+
+
+class HashingConfig(FrozenConfig):
+    executor: Literal["thread", "process"]
+    max_workers: PositiveInt
+    max_pending: PositiveInt
+
+
+class CacheConfig(FrozenConfig):
+    max_size: NonNegativeInt
+    ttl_seconds: NonNegativeFloat
+
+
+class ExportConfig(FrozenConfig):
+    batch_size: PositiveInt
+    max_batch_size: PositiveInt
+
+    @model_validator(mode="after")
+    def check_batch_size(self) -> Self:
+        if self.batch_size > self.max_batch_size:
+            raise ValueError("batch_size exceeds max_batch_size.")
+        return self
+
+
+class UsersConfig(FrozenConfig):
+    bulk_max_users: PositiveInt
+
+
+class OutboxConfig(FrozenConfig):
+    batch_size: PositiveInt
+    poll_interval_seconds: PositiveFloat
+    lease_seconds: PositiveFloat
+    max_attempts: PositiveInt
+    backoff_seconds: PositiveFloat
+    max_backoff_seconds: PositiveFloat
+    retention_days: PositiveInt
+
+
+class SMTPConfig(FrozenConfig):
+    pool_size: PositiveInt
+    max_messages: PositiveInt
+    timeout_seconds: PositiveFloat
+
+
+class MailConfig(FrozenConfig):
+    username: str
+    password: str
+    mail_from: EmailStr
+    port: int = Field(gt=0, lt=65536)
+    server: str
+    starttls: bool
+    ssl_tls: bool
+    use_credentials: bool
+    validate_certs: bool
+
+
+class MonitoringConfig(FrozenConfig):
+    slow_command_ms: NonNegativeFloat
+    metrics_enabled: bool = False
+    # Bearer token required by /metrics, if it is set
+    metrics_token: str = ""
+
+
+class MongoConfig(FrozenConfig):
+    url: str
+    database_name: str
+    max_page_size: PositiveInt
+
+
+class Config(FrozenConfig):
+    debug: bool = False
+    service_name: str
+    allow_origins: tuple[str, ...] = ()
+    secret_key: str | None = None
+    # PEM keys by "kid" for asymmetric signing algorithms
+    signing_keys: dict[str, str] = {}
+    auth: AuthConfig
+    hashing: HashingConfig
+    cache: CacheConfig
+    export: ExportConfig
+    users: UsersConfig
+    outbox: OutboxConfig
+    smtp: SMTPConfig
+    mail: MailConfig
+    mongo: MongoConfig
+    monitoring: MonitoringConfig
+
+
+Model = TypeVar("Model", bound=FrozenConfig)
+
+
+def _read_fields(model: type[FrozenConfig], source: Any) -> dict[str, Any]:
+    """
+    Read the model fields from Dynaconf settings or their table,
+    case-insensitively as environment variables are upper case
+    """
+    data = {}
+    for name, field in model.model_fields.items():
+        value = source.get(name)
+        if value is None:
+            continue
+        if isinstance(field.annotation, type) and issubclass(
+            field.annotation, FrozenConfig
+        ):
+            value = _read_fields(field.annotation, value)
+        data[name] = value
+
+    return data
+
+
+def load_config(model: type[Model], source: Any) -> Model:
+    """
+    Validate Dynaconf settings by the config model.
+    Params:
+        model (type[Model]) : The config model;
+        source (Any) : Dynaconf settings or their table
+    Return the config or raise ValidationError with all invalid fields
+    """
+    return model.model_validate(_read_fields(model, source))
+
+
+"""
+Validated on import, so misconfiguration fails at startup.
+Services read it instead of settings, which are looked up dynamically
+"""
+config = load_config(Config, settings)
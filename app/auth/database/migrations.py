@@ -0,0 +1,114 @@
+import asyncio
+from datetime import timedelta
+from typing import Any, Callable
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorCursor
+from pymongo import UpdateOne
+
+from app.auth.authentication.models import Authorization, token_digest
+from app.auth.config import config
+from app.auth.database.services import Database, db
+
+
+async def migrate_refresh_token_digests(
+    database: Database, batch_size: int = 1000
+) -> int:
+    """
+    Replace full refresh tokens of authorizations created before
+    digests were stored with their SHA-256 digests
+    and drop the index of full tokens.
+    Return the number of migrated authorizations
+    """
+    collection = database.database[Authorization.collection()]
+    documents = collection.find(
+        {"refresh_token": {"$exists": True}},
+        {"refresh_token": True},
+        batch_size=batch_size,
+    )
+
+    migrated = await _bulk_update(
+        collection,
+        documents,
+        lambda document: {
+            "$set": {
+                "refresh_token_digest": token_digest(document["refresh_token"])
+            },
+            "$unset": {"refresh_token": ""},
+        },
+        batch_size,
+    )
+
+    if "refresh_token_1" in await collection.index_information():
+        await collection.drop_index("refresh_token_1")
+
+    return migrated
+
+
+async def migrate_authorization_exp_dates(
+    database: Database, batch_size: int = 1000
+) -> int:
+    """
+    Set the expiration date of authorizations created before it was stored,
+    so the TTL index removes them. It is the creation date,
+    or the id timestamp if it is not set, plus the refresh token lifetime.
+    Return the number of migrated authorizations
+    """
+    collection = database.database[Authorization.collection()]
+    documents = collection.find(
+        {"exp_date": {"$exists": False}},
+        {"created": True},
+        batch_size=batch_size,
+    )
+    lifetime = timedelta(minutes=config.auth.refresh_token_exp_minutes)
+
+    return await _bulk_update(
+        collection,
+        documents,
+        lambda document: {
+            "$set": {
+                "exp_date": (
+                    document.get("created") or document["_id"].generation_time
+                )
+                + lifetime
+            }
+        },
+        batch_size,
+    )
+
+
+async def _bulk_update(
+    collection: AsyncIOMotorCollection[Any],
+    documents: AsyncIOMotorCursor[Any],
+    update: Callable[[dict[str, Any]], dict[str, Any]],
+    batch_size: int,
+) -> int:
+    """Update every found document by unordered batches of writes"""
+    updated = 0
+    updates = []
+    async for document in documents:
+        updates.append(UpdateOne({"_id": document["_id"]}, update(document)))
+        if len(updates) == batch_size:
+            await collection.bulk_write(updates, ordered=False)
+            updated += len(updates)
+            updates = []
+
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+        updated += len(updates)
+
+    return updated
+
+
+async def main() -> None:
+    print(
+        "Migrated refresh token digests:",
+        await migrate_refresh_token_digests(db),
+    )
+    print(
+        "Migrated authorization expiration dates:",
+        await migrate_authorization_exp_dates(db),
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import logging
+from typing import Any, Mapping
+
+from pymongo import monitoring
+
+from app.auth.config import config
+from app.auth.metrics import mongo_command_duration
+
+logger = logging.getLogger(__name__)
+
+"""Where the filter of a command is, by command name"""
+FILTER_PATHS: dict[str, tuple[str | int, ...]] = {
+    "find": ("filter",),
+    "findAndModify": ("query",),
+    "update": ("updates", 0, "q"),
+    "delete": ("deletes", 0, "q"),
+    "count": ("query",),
+    "distinct": ("query",),
+    "aggregate": ("pipeline", 0, "$match"),
+}
+
+
+def filter_shape(value: Any) -> Any:
+    """
+    Replace the values of a filter with "?", keeping field names
+    and operators, so the log does not contain user data
+    """
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if isinstance(value, list) and any(
+        isinstance(item, dict) for item in value
+    ):
+        return [filter_shape(item) for item in value]
+    return "?"
+
+
+def command_filter(command_name: str, command: Mapping[str, Any]) -> Any:
+    value: Any = command
+    for key in FILTER_PATHS.get(command_name, ()):
+        try:
+            value = value[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return value if value is not command else None
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    Record the duration of every command by collection
+    and log commands slower than the threshold with their filter shape.
+    The driver calls it from its threads,
+    so durations are passed to the metrics thread-safely
+    """
+
+    def __init__(self, slow_command_ms: float) -> None:
+        self.slow_command_ms = slow_command_ms
+        # Collection and command of the running commands
+        self.commands: dict[tuple[Any, int], tuple[str, Mapping[str, Any]]] = (
+            {}
+        )
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        self.commands[(event.connection_id, event.request_id)] = (
+            collection if isinstance(collection, str) else "",
+            event.command,
+        )
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self.finished(event, "ok")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self.finished(event, "failed")
+
+    def finished(
+        self,
+        event: (
+            monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent
+        ),
+        status: str,
+    ) -> None:
+        collection, command = self.commands.pop(
+            (event.connection_id, event.request_id), ("", {})
+        )
+        mongo_command_duration.observe(
+            event.duration_micros / 1_000_000,
+            event.command_name,
+            collection,
+            status,
+        )
+
+        duration_ms = event.duration_micros / 1000
+        if duration_ms >= self.slow_command_ms:
+            logger.warning(
+                "Slow MongoDB command %s on %s.%s took %.1f ms, filter %s",
+                event.command_name,
+                event.database_name,
+                collection,
+                duration_ms,
+                filter_shape(command_filter(event.command_name, command)),
+            )
+
+
+command_monitor = CommandMonitor(config.monitoring.slow_command_ms)
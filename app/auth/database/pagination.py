@@ -0,0 +1,54 @@
+import base64
+import binascii
+from typing import Any
+
+from bson import ObjectId, json_util
+from bson.errors import InvalidId
+from pymongo import ASCENDING
+
+
+def encode_cursor(sort_key: str, document: dict[str, Any]) -> str:
+    """
+    Encode the position after the document as an opaque cursor.
+    The cursor keeps the sort key value and the id of the document
+    """
+    document_id = ObjectId(document["_id"])
+    value = document_id if sort_key == "_id" else document.get(sort_key)
+    data = json_util.dumps(
+        {"key": sort_key, "value": value, "id": document_id}
+    )
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, Any, ObjectId]:
+    """
+    Return the sort key, its value and the document id from the cursor.
+    Raise ValueError if the cursor is malformed
+    """
+    try:
+        data = json_util.loads(
+            base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        )
+        return data["key"], data["value"], ObjectId(data["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError("Invalid cursor.")
+
+
+def keyset_query(cursor: str, direction: int) -> dict[str, Any]:
+    """
+    Build the query for documents after the cursor position.
+    Documents are sorted by the sort key and then by id,
+    so the id breaks ties between equal sort key values
+    """
+    sort_key, value, document_id = decode_cursor(cursor)
+    operator = "$gt" if direction == ASCENDING else "$lt"
+
+    if sort_key == "_id":
+        return {"_id": {operator: document_id}}
+
+    return {
+        "$or": [
+            {sort_key: {operator: value}},
+            {sort_key: value, "_id": {operator: document_id}},
+        ]
+    }
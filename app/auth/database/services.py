@@ -1,161 +1,617 @@
-from datetime import UTC, datetime
-from typing import Any, Literal, TypeVar, overload
-
-from bson import ObjectId
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from pymongo import ReturnDocument
-
-from app.auth.authentication.models import Authorization
-from app.auth.config import settings
-from app.auth.database.exceptions import (
-    DatabaseInsertionError,
-    DocumentNotFound,
-)
-from app.auth.models import SortDirection
-from app.auth.users.models import User
-from app.auth.verification.models import Verification
-
-Document = TypeVar("Document", User, Authorization, Verification)
-
-
-class Database:
-    """ODM for connecting to MongoDB and general methods to use it"""
-
-    def __init__(self, url: str, database_name: str) -> None:
-        self.client: AsyncIOMotorClient[Any] = AsyncIOMotorClient(url)
-        self.database: AsyncIOMotorDatabase[Any] = self.client[database_name]
-
-    @overload
-    async def find(
-        self,
-        model: type[Document],
-        query: dict[str, any],
-        exception: Literal[True],
-    ) -> Document:
-        """
-        @overload to specify for mypy,
-        if the exception arg is true, return value never be None.
-        """
-        pass
-
-    @overload
-    async def find(
-        self,
-        model: type[Document],
-        query: dict[str, any],
-        exception: Literal[False],
-    ) -> Document | None:
-        pass
-
-    @overload
-    async def find(
-        self,
-        model: type[Document],
-        query: dict[str, any],
-        exception: bool = False,
-    ) -> Document | None:
-        pass
-
-    async def find(
-        self,
-        model: type[Document],
-        query: dict[str, any],
-        exception: bool = False,
-    ) -> Document | None:
-        """
-        The method to find a document.
-        Params:
-            model (type[Document]) : The model to get a collection
-            and validate result;
-            exception (bool) : Raise exception if document is not found,
-            return None if false
-        Return the instance of model
-        """
-        document = await self.database[model.collection()].find_one(query)
-        if document is not None:
-            return model(**document)
-
-        if exception:
-            raise DocumentNotFound(collection=model.collection(), query=query)
-
-        return None
-
-    async def find_many(
-        self,
-        model: type[Document],
-        query: dict[str, Any],
-        sort: dict[str, SortDirection] | None = None,
-        skip: int | None = None,
-        limit: int | None = None,
-    ) -> list[Document]:
-        documents = self.database[model.collection()].find(
-            query, sort=sort, skip=skip, limit=limit
-        )
-        return [model(**document) async for document in documents]
-
-    async def insert(self, document: Document) -> Document:
-        """
-        The method to insert a document.
-        If the document id is str then
-        it will be replaced with the ObjectId
-        Params:
-            document (Document): the instance of
-            User, Authorization or Verification
-        Return the inserted document or raise DatabaseInsertionError
-        """
-        document.created = datetime.now(UTC)
-
-        # Check if an inserting document id is ObjectId
-        if not isinstance(document.id, ObjectId):
-            document.id = ObjectId(document.id)
-        res = await self.database[document.collection()].insert_one(
-            document.model_dump(by_alias=True)
-        )
-        new_document = await self.find(
-            type(document), {"_id": res.inserted_id}
-        )
-        if new_document:
-            return new_document
-
-        raise DatabaseInsertionError(
-            document.collection(), {"_id": res.inserted_id}
-        )
-
-    async def replace(self, document: Document) -> Document:
-        """
-        The method to update a document.
-        Params:
-            document (Document): the instance that should be updated
-        Return the updated document of raise DocumentNotFound
-        """
-        document_dict = document.model_dump(by_alias=True)
-        document_dict.update(
-            {
-                "_id": ObjectId(document_dict["_id"]),
-                "updated": datetime.now(UTC),
-            }
-        )
-        query: dict[str, ObjectId] = {"_id": ObjectId(document.id)}
-        if res := await self.database[
-            document.collection()
-        ].find_one_and_replace(
-            query, document_dict, return_document=ReturnDocument.AFTER
-        ):
-            return type(document)(**res)
-
-        raise DocumentNotFound(collection=document.collection(), query=query)
-
-    async def delete(self, document: Document) -> None:
-        res = await self.database[document.collection()].delete_one(
-            {"_id": ObjectId(document.id)}
-        )
-
-        if res.deleted_count == 1:
-            return None
-
-        raise DocumentNotFound(
-            collection=document.collection(), query={"_id": document.id}
-        )
-
-
-db = Database(settings.mongo.url, settings.mongo.database_name)
+import logging
+from datetime import UTC, datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Literal,
+    MutableMapping,
+    Sequence,
+    TypeVar,
+    overload,
+)
+
+from bson import ObjectId
+from motor.motor_asyncio import (
+    AsyncIOMotorClient,
+    AsyncIOMotorCollection,
+    AsyncIOMotorDatabase,
+)
+from pydantic import BaseModel
+from pymongo import IndexModel, ReturnDocument, monitoring
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from app.auth.authentication.models import Authorization
+from app.auth.cache import TTLCache
+from app.auth.config import config
+from app.auth.database.exceptions import (
+    DatabaseInsertionError,
+    DocumentNotFound,
+)
+from app.auth.database.monitoring import command_monitor
+from app.auth.database.pagination import encode_cursor, keyset_query
+from app.auth.database.types import PyObjectId, _trusted_context
+from app.auth.mail.models import OutboxMessage
+from app.auth.metrics import observe_db
+from app.auth.models import (
+    BulkDeleteResult,
+    BulkUpdateResult,
+    ListParams,
+    Page,
+    SortDirection,
+)
+from app.auth.users.models import User
+from app.auth.verification.models import Verification
+
+logger = logging.getLogger(__name__)
+
+"""IndexOptionsConflict and IndexKeySpecsConflict error codes"""
+INDEX_CONFLICT_CODES = (85, 86)
+
+Document = TypeVar(
+    "Document", User, Authorization, Verification, OutboxMessage
+)
+document_models = (User, Authorization, Verification, OutboxMessage)
+
+
+class Database:
+    """ODM for connecting to MongoDB and general methods to use it"""
+
+    def __init__(
+        self,
+        url: str,
+        database_name: str,
+        max_page_size: int,
+        cache: TTLCache[tuple[str, str], Any],
+        event_listeners: Sequence[monitoring.CommandListener] = (),
+    ) -> None:
+        self.client: AsyncIOMotorClient[Any] = AsyncIOMotorClient(
+            url, event_listeners=event_listeners
+        )
+        self.database: AsyncIOMotorDatabase[Any] = self.client[database_name]
+        self.max_page_size = max_page_size
+        self.cache = cache
+
+    async def create_indexes(self) -> None:
+        """
+        Create indexes declared by the document models.
+        Safe to call on every startup, existing indexes are kept.
+        An index whose options were changed by the configuration
+        is updated in place or rebuilt
+        """
+        for model in document_models:
+            collection = self.database[model.collection()]
+            for index in model.indexes():
+                try:
+                    await collection.create_indexes([index])
+                except OperationFailure as error:
+                    if error.code not in INDEX_CONFLICT_CODES:
+                        raise
+                    await self._replace_index(collection, index)
+
+    async def _replace_index(
+        self, collection: AsyncIOMotorCollection[Any], index: IndexModel
+    ) -> None:
+        """
+        Apply changed options to the existing index with the same name
+        or keys. Only the TTL is changed in place by collMod,
+        other changes need the index to be dropped and built again
+        """
+        document = index.document
+        keys = list(document["key"].items())
+        indexes: MutableMapping[str, dict[str, Any]] = (
+            await collection.index_information()
+        )
+        name, existing = next(
+            (
+                (name, info)
+                for name, info in indexes.items()
+                if name == document["name"] or list(info["key"]) == keys
+            ),
+            (document["name"], {}),
+        )
+        changed = {
+            option
+            for option in (set(document) | set(existing))
+            - {"name", "key", "v"}
+            if document.get(option) != existing.get(option)
+        }
+
+        logger.warning(
+            "Index %s of %s has changed options %s, updating it.",
+            name,
+            collection.name,
+            sorted(changed),
+        )
+        if (
+            changed == {"expireAfterSeconds"}
+            and list(existing["key"]) == keys
+            and "expireAfterSeconds" in existing
+        ):
+            await self.database.command(
+                {
+                    "collMod": collection.name,
+                    "index": {
+                        "name": name,
+                        "expireAfterSeconds": document["expireAfterSeconds"],
+                    },
+                }
+            )
+            return
+
+        await collection.drop_index(name)
+        await collection.create_indexes([index])
+
+    @overload
+    async def find(
+        self,
+        model: type[Document],
+        query: dict[str, any],
+        exception: Literal[True],
+    ) -> Document:
+        """
+        @overload to specify for mypy,
+        if the exception arg is true, return value never be None.
+        """
+        pass
+
+    @overload
+    async def find(
+        self,
+        model: type[Document],
+        query: dict[str, any],
+        exception: Literal[False],
+    ) -> Document | None:
+        pass
+
+    @overload
+    async def find(
+        self,
+        model: type[Document],
+        query: dict[str, any],
+        exception: bool = False,
+    ) -> Document | None:
+        pass
+
+    @observe_db("find")
+    async def find(
+        self,
+        model: type[Document],
+        query: dict[str, any],
+        exception: bool = False,
+    ) -> Document | None:
+        """
+        The method to find a document.
+        Params:
+            model (type[Document]) : The model to get a collection
+            and validate result;
+            exception (bool) : Raise exception if document is not found,
+            return None if false
+        Return the instance of model
+        """
+        document = await self.database[model.collection()].find_one(
+            query, collation=model.collation()
+        )
+        if document is not None:
+            return self.hydrate(model, document)
+
+        if exception:
+            raise DocumentNotFound(collection=model.collection(), query=query)
+
+        return None
+
+    async def get(
+        self, model: type[Document], id: PyObjectId | ObjectId
+    ) -> Document:
+        """
+        The method to find a document by id through the cache.
+        Cached documents are shared, so they must not be changed in place.
+        Return the instance of model or raise DocumentNotFound
+        """
+        key = (model.collection(), str(id))
+        document: Document | None = self.cache.get(key)
+        if document is None:
+            document = await self.find(model, {"_id": ObjectId(id)}, True)
+            self.cache.set(key, document)
+
+        return document
+
+    @observe_db("find_many")
+    async def find_many(
+        self,
+        model: type[Document],
+        query: dict[str, Any],
+        sort: dict[str, SortDirection] | None = None,
+        skip: int | None = None,
+        limit: int | None = None,
+    ) -> list[Document]:
+        """
+        The method to find documents.
+        The limit can't exceed the maximum page size, None or 0 means it
+        """
+        documents = self.database[model.collection()].find(
+            query,
+            sort=sort,
+            skip=skip,
+            limit=self.page_size(limit),
+            collation=model.collation(),
+        )
+        return [self.hydrate(model, document) async for document in documents]
+
+    @observe_db("find_page")
+    async def find_page(
+        self, model: type[Document], query: dict[str, Any], params: ListParams
+    ) -> Page[Document]:
+        """
+        The method to find a page of documents by keyset pagination.
+        Documents are sorted by the sort key and then by id
+        and the next page starts after the last document of the current one,
+        so the database never walks through the previous pages.
+        Return the page with the next page cursor, None if it is the last one
+        """
+        if params.cursor:
+            query = {
+                "$and": [
+                    query,
+                    keyset_query(params.cursor, params.sort_direction),
+                ]
+            }
+
+        limit = self.page_size(params.limit)
+        documents = await self.find_many(
+            model,
+            query,
+            sort={
+                params.sort_key: params.sort_direction,
+                "_id": params.sort_direction,
+            },
+            limit=limit,
+        )
+
+        next_cursor = None
+        if len(documents) == limit:
+            next_cursor = encode_cursor(
+                params.sort_key, documents[-1].model_dump(by_alias=True)
+            )
+
+        return Page(items=documents, next_cursor=next_cursor)
+
+    @observe_db("distinct")
+    async def distinct(
+        self, model: type[Document], key: str, query: dict[str, Any]
+    ) -> list[Any]:
+        """The method to get distinct values of the key in found documents"""
+        values: list[Any] = await self.database[model.collection()].distinct(
+            key, query, collation=model.collation()
+        )
+        return values
+
+    async def stream(
+        self,
+        model: type[Document],
+        query: dict[str, Any],
+        projection: dict[str, Any] | None = None,
+        batch_size: int = 0,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        The method to iterate over raw documents straight from the cursor.
+        Documents are neither validated nor collected in memory,
+        the batch size sets how many of them are fetched per round trip
+        """
+        documents = self.database[model.collection()].find(
+            query,
+            projection,
+            batch_size=batch_size,
+            collation=model.collation(),
+        )
+        async for document in documents:
+            yield document
+
+    @staticmethod
+    def hydrate(model: type[Document], document: dict[str, Any]) -> Document:
+        """
+        Create the model instance from a document of the database.
+        Documents were validated before they were written,
+        so they are validated in the trusted context skipping email parsing.
+        API input is still validated fully, without the context
+        """
+        return model.model_validate(document, context=_trusted_context)
+
+    def page_size(self, limit: int | None) -> int:
+        return min(limit or self.max_page_size, self.max_page_size)
+
+    @observe_db("insert", "document")
+    async def insert(
+        self, document: Document, read_back: bool = False
+    ) -> Document:
+        """
+        The method to insert a document.
+        If the document id is str then
+        it will be replaced with the ObjectId
+        Params:
+            document (Document): the instance of
+            User, Authorization or Verification;
+            read_back (bool): Find the inserted document in the database,
+            only needed for values set by the server
+        Return the inserted document or raise DatabaseInsertionError
+        """
+        document.created = datetime.now(UTC)
+
+        # Check if an inserting document id is ObjectId
+        if not isinstance(document.id, ObjectId):
+            document.id = ObjectId(document.id)
+        document_dict = document.model_dump(by_alias=True)
+        res = await self.database[document.collection()].insert_one(
+            document_dict
+        )
+        if not read_back:
+            return self.hydrate(
+                type(document), document_dict | {"_id": res.inserted_id}
+            )
+
+        new_document = await self.find(
+            type(document), {"_id": res.inserted_id}
+        )
+        if new_document:
+            return new_document
+
+        raise DatabaseInsertionError(
+            document.collection(), {"_id": res.inserted_id}
+        )
+
+    async def insert_many(
+        self, documents: list[Document]
+    ) -> tuple[list[Document], dict[int, dict[str, Any]]]:
+        """
+        The method to insert documents by one unordered write,
+        so a failed document does not stop the others.
+        Params:
+            documents (list[Document]): the documents of one model
+        Return the documents as inserted, in the same order,
+        and write errors by the index of the documents not inserted
+        """
+        if not documents:
+            return [], {}
+
+        created = datetime.now(UTC)
+        document_dicts = []
+        for document in documents:
+            document.created = created
+            document_dicts.append(
+                document.model_dump(by_alias=True)
+                | {"_id": ObjectId(document.id)}
+            )
+
+        errors: dict[int, dict[str, Any]] = {}
+        try:
+            await self.database[documents[0].collection()].insert_many(
+                document_dicts, ordered=False
+            )
+        except BulkWriteError as error:
+            errors = {
+                write_error["index"]: write_error
+                for write_error in error.details["writeErrors"]
+            }
+
+        inserted = [
+            self.hydrate(type(document), document_dict)
+            for document, document_dict in zip(documents, document_dicts)
+        ]
+        return inserted, errors
+
+    @observe_db("replace", "document")
+    async def replace(self, document: Document) -> Document:
+        """
+        The method to update a document.
+        Params:
+            document (Document): the instance that should be updated
+        Return the updated document of raise DocumentNotFound
+        """
+        document_dict = document.model_dump(by_alias=True)
+        document_dict.update(
+            {
+                "_id": ObjectId(document_dict["_id"]),
+                "updated": datetime.now(UTC),
+            }
+        )
+        query: dict[str, ObjectId] = {"_id": ObjectId(document.id)}
+        if res := await self.database[
+            document.collection()
+        ].find_one_and_replace(
+            query, document_dict, return_document=ReturnDocument.AFTER
+        ):
+            self.cache.delete((document.collection(), str(document.id)))
+            return self.hydrate(type(document), res)
+
+        raise DocumentNotFound(collection=document.collection(), query=query)
+
+    @overload
+    async def update(
+        self,
+        model: type[Document],
+        id: PyObjectId | ObjectId,
+        changes: BaseModel | dict[str, Any],
+        projection: None = None,
+    ) -> Document:
+        pass
+
+    @overload
+    async def update(
+        self,
+        model: type[Document],
+        id: PyObjectId | ObjectId,
+        changes: BaseModel | dict[str, Any],
+        projection: dict[str, Any],
+    ) -> dict[str, Any]:
+        """
+        @overload to specify for mypy,
+        if the projection is set, the partial document is returned as dict.
+        """
+        pass
+
+    async def update(
+        self,
+        model: type[Document],
+        id: PyObjectId | ObjectId,
+        changes: BaseModel | dict[str, Any],
+        projection: dict[str, Any] | None = None,
+    ) -> Document | dict[str, Any]:
+        """
+        The method to update only the changed fields of a document by id.
+        See find_and_update for params.
+        Return the updated document or raise DocumentNotFound
+        """
+        return await self.find_and_update(
+            model, {"_id": ObjectId(id)}, changes, projection
+        )
+
+    @overload
+    async def find_and_update(
+        self,
+        model: type[Document],
+        query: dict[str, Any],
+        changes: BaseModel | dict[str, Any],
+        projection: None = None,
+    ) -> Document:
+        pass
+
+    @overload
+    async def find_and_update(
+        self,
+        model: type[Document],
+        query: dict[str, Any],
+        changes: BaseModel | dict[str, Any],
+        projection: dict[str, Any],
+    ) -> dict[str, Any]:
+        pass
+
+    @observe_db("update")
+    async def find_and_update(
+        self,
+        model: type[Document],
+        query: dict[str, Any],
+        changes: BaseModel | dict[str, Any],
+        projection: dict[str, Any] | None = None,
+    ) -> Document | dict[str, Any]:
+        """
+        The method to atomically update only the changed fields
+        of the first document matching the query.
+        Params:
+            model (type[Document]) : The model to get a collection
+            and validate result;
+            query (dict[str, Any]) : The condition of the update;
+            changes (BaseModel | dict[str, Any]) : Fields to set,
+            only the fields set on a model, so None clears a field;
+            projection (dict[str, Any] | None) : Fields to return,
+            the document is returned as dict if it is set
+        Return the updated document or raise DocumentNotFound
+        """
+        res = await self.database[model.collection()].find_one_and_update(
+            query,
+            self._update_document(changes),
+            projection=projection,
+            return_document=ReturnDocument.AFTER,
+            collation=model.collation(),
+        )
+        if res is None:
+            raise DocumentNotFound(collection=model.collection(), query=query)
+
+        if "_id" in res:
+            self.cache.delete((model.collection(), str(res["_id"])))
+        if projection is not None:
+            return dict(res)
+
+        return self.hydrate(model, res)
+
+    @observe_db("update_many")
+    async def update_many(
+        self,
+        model: type[Document],
+        query: dict[str, Any],
+        changes: BaseModel | dict[str, Any],
+        operators: dict[str, Any] | None = None,
+    ) -> BulkUpdateResult:
+        """
+        The method to update the changed fields of all documents
+        matching the query by one server-side operation.
+        Cached documents of the collection are invalidated.
+        Params:
+            model (type[Document]) : The model to get a collection;
+            query (dict[str, Any]) : The condition of the update,
+            must not be empty;
+            changes (BaseModel | dict[str, Any]) : Fields to set,
+            only the fields set on a model, so None clears a field;
+            operators (dict[str, Any] | None) : Other update operators
+            such as $addToSet, they must not change the same fields
+        Return matched and modified counts
+        """
+        if not query:
+            raise ValueError("The query must not be empty.")
+
+        res = await self.database[model.collection()].update_many(
+            query,
+            self._update_document(changes) | (operators or {}),
+            collation=model.collation(),
+        )
+        self.invalidate(model)
+        return BulkUpdateResult(
+            matched=res.matched_count, modified=res.modified_count
+        )
+
+    @observe_db("delete_many")
+    async def delete_many(
+        self, model: type[Document], query: dict[str, Any]
+    ) -> BulkDeleteResult:
+        """
+        The method to delete all documents matching the query,
+        the query must not be empty.
+        Cached documents of the collection are invalidated.
+        Return the deleted count
+        """
+        if not query:
+            raise ValueError("The query must not be empty.")
+
+        res = await self.database[model.collection()].delete_many(
+            query, collation=model.collation()
+        )
+        self.invalidate(model)
+        return BulkDeleteResult(deleted=res.deleted_count)
+
+    @staticmethod
+    def _update_document(
+        changes: BaseModel | dict[str, Any]
+    ) -> dict[str, Any]:
+        if isinstance(changes, BaseModel):
+            changes = changes.model_dump(by_alias=True, exclude_unset=True)
+
+        update: dict[str, Any] = {"$currentDate": {"updated": True}}
+        if changes:
+            update["$set"] = changes
+        return update
+
+    def invalidate(self, model: type[Document]) -> None:
+        """Drop all cached documents of the model collection"""
+        collection = model.collection()
+        self.cache.evict(lambda key: key[0] == collection)
+
+    @observe_db("delete", "document")
+    async def delete(self, document: Document) -> None:
+        res = await self.database[document.collection()].delete_one(
+            {"_id": ObjectId(document.id)}
+        )
+
+        if res.deleted_count == 1:
+            self.cache.delete((document.collection(), str(document.id)))
+            return None
+
+        raise DocumentNotFound(
+            collection=document.collection(), query={"_id": document.id}
+        )
+
+
+db = Database(
+    config.mongo.url,
+    config.mongo.database_name,
+    config.mongo.max_page_size,
+    TTLCache(config.cache.max_size, config.cache.ttl_seconds),
+    [command_monitor],
+)
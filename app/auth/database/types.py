@@ -1,6 +1,40 @@
-from typing import Annotated
-
-from pydantic import BeforeValidator
-
-"""Reformatting ObjectId to str after docs getting from the database"""
-PyObjectId = Annotated[str, BeforeValidator(str)]
+from types import MappingProxyType
+from typing import Annotated, Mapping
+
+from pydantic import (
+    AfterValidator,
+    BeforeValidator,
+    ValidationInfo,
+    WithJsonSchema,
+)
+from pydantic.networks import validate_email
+
+"""Reformatting ObjectId to str after docs getting from the database"""
+PyObjectId = Annotated[str, BeforeValidator(str)]
+
+_TRUSTED = object()
+
+"""
+Validation context of documents read from the database,
+only Database.hydrate passes it. The documents were validated
+before they were written, so the costly checks below are skipped.
+The key is private and the mapping is read-only
+"""
+_trusted_context: Mapping[object, bool] = MappingProxyType({_TRUSTED: True})
+
+
+def _validate_email(value: str, info: ValidationInfo) -> str:
+    if info.context and info.context.get(_TRUSTED):
+        return value
+    return validate_email(value)[1]
+
+
+"""
+EmailStr that is not parsed again in the trusted context,
+email parsing is the most of the user validation time
+"""
+Email = Annotated[
+    str,
+    AfterValidator(_validate_email),
+    WithJsonSchema({"type": "string", "format": "email"}),
+]
@@ -0,0 +1,107 @@
+import asyncio
+from contextlib import suppress
+from email.message import EmailMessage
+
+from aiosmtplib import SMTP, SMTPException
+
+
+class SMTPPool:
+    """
+    Long-lived SMTP connections shared by the mail senders.
+    A connection is opened (with STARTTLS and login) when no idle one
+    is left and is reused for the next messages, so the TLS handshake
+    and the login are not repeated for every message.
+    A connection is replaced after max_messages to respect relay limits.
+    An idle connection closed by the server is dropped
+    and the message is sent by a new one
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: str | None = None,
+        password: str | None = None,
+        use_tls: bool = False,
+        start_tls: bool = False,
+        validate_certs: bool = True,
+        timeout: float = 60,
+        pool_size: int = 1,
+        max_messages: int = 100,
+    ) -> None:
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.validate_certs = validate_certs
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.max_messages = max_messages
+        self._idle: list[SMTP] = []
+        self._sent: dict[SMTP, int] = {}
+        self._slots: asyncio.Semaphore | None = None
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        """Created on first use to be bound to the running loop"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        return self._slots
+
+    async def connect(self) -> SMTP:
+        smtp = SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            validate_certs=self.validate_certs,
+            timeout=self.timeout,
+        )
+        await smtp.connect()
+        self._sent[smtp] = 0
+        return smtp
+
+    def discard(self, smtp: SMTP) -> None:
+        self._sent.pop(smtp, None)
+        smtp.close()
+
+    async def retire(self, smtp: SMTP) -> None:
+        self._sent.pop(smtp, None)
+        with suppress(SMTPException, OSError):
+            await smtp.quit()
+        smtp.close()
+
+    async def send(self, message: EmailMessage) -> None:
+        """
+        Send the message by an idle or a new connection.
+        Raise SMTPException or OSError if it can not be sent
+        """
+        async with self.slots:
+            while True:
+                reused = bool(self._idle)
+                smtp = self._idle.pop() if reused else await self.connect()
+                try:
+                    await smtp.send_message(message)
+                except (ConnectionError, TimeoutError):
+                    self.discard(smtp)
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    self.discard(smtp)
+                    raise
+                break
+
+            self._sent[smtp] += 1
+            if smtp.is_connected and self._sent[smtp] < self.max_messages:
+                self._idle.append(smtp)
+            else:
+                await self.retire(smtp)
+
+    async def close(self) -> None:
+        while self._idle:
+            await self.retire(self._idle.pop())
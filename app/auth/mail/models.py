@@ -0,0 +1,49 @@
+from datetime import UTC, datetime
+from enum import StrEnum
+
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+
+from app.auth.config import config
+from app.auth.database.types import Email
+from app.auth.models import BaseDocument, Collection
+
+
+class OutboxStatus(StrEnum):
+    pending = "pending"
+    sending = "sending"
+    sent = "sent"
+    failed = "failed"
+
+
+class OutboxMessage(BaseDocument):
+    """
+    The email waiting to be delivered by the outbox worker.
+    next_attempt is the retry time of a pending message
+    and the lease expiration of a claimed (sending) one
+    """
+
+    recipients: list[Email]
+    subject: str
+    body: str
+    status: OutboxStatus = OutboxStatus.pending
+    attempts: int = 0
+    next_attempt: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    claim_id: str | None = None
+    last_error: str | None = None
+    sent_date: datetime | None = None
+
+    @classmethod
+    def collection(cls) -> str:
+        return Collection.outbox
+
+    @classmethod
+    def indexes(cls) -> list[IndexModel]:
+        return [
+            IndexModel([("status", ASCENDING), ("next_attempt", ASCENDING)]),
+            IndexModel("claim_id"),
+            IndexModel(
+                "sent_date",
+                expireAfterSeconds=config.outbox.retention_days * 86400,
+            ),
+        ]
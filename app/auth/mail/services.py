@@ -0,0 +1,217 @@
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import UTC, datetime, timedelta
+from email.message import EmailMessage
+from typing import Awaitable, Callable
+
+from bson import ObjectId
+
+from app.auth.config import config
+from app.auth.database.services import Database, db
+from app.auth.mail.client import SMTPPool
+from app.auth.mail.models import OutboxMessage, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+Sender = Callable[[OutboxMessage], Awaitable[None]]
+
+smtp_pool = SMTPPool(
+    config.mail.server,
+    config.mail.port,
+    config.mail.username if config.mail.use_credentials else None,
+    config.mail.password if config.mail.use_credentials else None,
+    use_tls=config.mail.ssl_tls,
+    start_tls=config.mail.starttls,
+    validate_certs=config.mail.validate_certs,
+    timeout=config.smtp.timeout_seconds,
+    pool_size=config.smtp.pool_size,
+    max_messages=config.smtp.max_messages,
+)
+
+
+def build_email(message: OutboxMessage) -> EmailMessage:
+    email = EmailMessage()
+    email["From"] = config.mail.mail_from
+    email["To"] = ", ".join(message.recipients)
+    email["Subject"] = message.subject
+    email.set_content(message.body, subtype="html")
+    return email
+
+
+async def send_message(message: OutboxMessage) -> None:
+    await smtp_pool.send(build_email(message))
+
+
+class OutboxWorker:
+    """
+    Background delivery of the outbox messages.
+    A batch is claimed by one update, so several workers
+    never send the same message while its lease is valid.
+    Failed messages are retried with exponential backoff,
+    a message of a crashed worker is claimed again after the lease
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        sender: Sender,
+        batch_size: int,
+        poll_interval: float,
+        lease_seconds: float,
+        max_attempts: int,
+        backoff_seconds: float,
+        max_backoff_seconds: float,
+    ) -> None:
+        self.database = database
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def collection(self) -> str:
+        return OutboxMessage.collection()
+
+    @property
+    def lease(self) -> timedelta:
+        return timedelta(seconds=self.lease_seconds)
+
+    def backoff(self, attempts: int) -> timedelta:
+        return timedelta(
+            seconds=min(
+                self.backoff_seconds * 2 ** (attempts - 1),
+                self.max_backoff_seconds,
+            )
+        )
+
+    async def claim(self) -> list[OutboxMessage]:
+        """
+        Claim the batch of due messages.
+        Return the messages leased to this call
+        """
+        collection = self.database.database[self.collection]
+        now = datetime.now(UTC)
+        due = {
+            "status": {"$in": [OutboxStatus.pending, OutboxStatus.sending]},
+            "next_attempt": {"$lte": now},
+        }
+        ids = [
+            document["_id"]
+            async for document in collection.find(
+                due, {"_id": True}, limit=self.batch_size
+            ).sort("next_attempt")
+        ]
+        if not ids:
+            return []
+
+        claim_id = str(ObjectId())
+        await collection.update_many(
+            due | {"_id": {"$in": ids}},
+            {
+                "$set": {
+                    "status": OutboxStatus.sending,
+                    "claim_id": claim_id,
+                    "next_attempt": now + self.lease,
+                },
+                "$currentDate": {"updated": True},
+            },
+        )
+        return [
+            self.database.hydrate(OutboxMessage, document)
+            async for document in collection.find({"claim_id": claim_id})
+        ]
+
+    async def deliver(self, message: OutboxMessage) -> None:
+        """Send the message and record the delivery state"""
+        changes: dict[str, object]
+        try:
+            await self.sender(message)
+        except Exception as exc:
+            attempts = message.attempts + 1
+            changes = {
+                "attempts": attempts,
+                "last_error": f"{type(exc).__name__}: {exc}",
+            }
+            if attempts >= self.max_attempts:
+                changes["status"] = OutboxStatus.failed
+            else:
+                changes["status"] = OutboxStatus.pending
+                changes["next_attempt"] = datetime.now(UTC) + self.backoff(
+                    attempts
+                )
+        else:
+            changes = {
+                "status": OutboxStatus.sent,
+                "attempts": message.attempts + 1,
+                "sent_date": datetime.now(UTC),
+            }
+
+        # The lease may be expired and the message claimed again,
+        # the state is recorded only by the current claim
+        await self.database.database[self.collection].update_one(
+            {"_id": ObjectId(message.id), "claim_id": message.claim_id},
+            {"$set": changes, "$currentDate": {"updated": True}},
+        )
+
+    async def process_batch(self) -> int:
+        """
+        Claim and deliver one batch concurrently.
+        Return the number of claimed messages
+        """
+        messages = await self.claim()
+        await asyncio.gather(*(self.deliver(message) for message in messages))
+        return len(messages)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                processed = await self.process_batch()
+            except Exception:
+                logger.exception("Outbox delivery failed.")
+                processed = 0
+
+            if processed < self.batch_size:
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), self.poll_interval
+                    )
+                self._wakeup.clear()
+
+    def wakeup(self) -> None:
+        """Start the next batch without waiting for the poll interval"""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+outbox_worker = OutboxWorker(
+    db,
+    send_message,
+    config.outbox.batch_size,
+    config.outbox.poll_interval_seconds,
+    config.outbox.lease_seconds,
+    config.outbox.max_attempts,
+    config.outbox.backoff_seconds,
+    config.outbox.max_backoff_seconds,
+)
+
+
+async def enqueue_email(message: OutboxMessage) -> None:
+    """Store the message to be sent by the outbox worker"""
+    await db.insert(message)
+    outbox_worker.wakeup()
@@ -0,0 +1,309 @@
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Coroutine,
+    Iterator,
+    ParamSpec,
+    TypeVar,
+)
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+"""Seconds, from a cached token decode to a slow bcrypt call"""
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    )
+    return f"{{{pairs}}}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    """
+    Monotonic counter by label values.
+    Metrics are recorded from the event loop only, so there are no locks
+    """
+
+    def __init__(
+        self, name: str, documentation: str, labels: tuple[str, ...] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        for label_values, value in self.values.items():
+            labels = _labels(self.labels, label_values)
+            yield f"{self.name}{labels} {value}"
+
+
+class _Series:
+    """Bucket counts, the last one is +Inf, and the sum of values"""
+
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * (buckets + 1)
+        self.sum = 0.0
+
+
+class Histogram:
+    """
+    Histogram by label values with fixed buckets.
+    An observation increments one bucket found by bisection,
+    cumulative counts are computed only when rendered.
+    The driver reports commands from its threads, so series are locked
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.series: dict[tuple[str, ...], _Series] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = _Series(len(self.buckets))
+            series.counts[index] += 1
+            series.sum += value
+
+    def time(
+        self, *label_values: str
+    ) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+        """Decorator to observe the duration of a coroutine function"""
+
+        def decorator(
+            func: Callable[P, Awaitable[R]]
+        ) -> Callable[P, Awaitable[R]]:
+            @wraps(func)
+            async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *label_values)
+
+            return wrapper
+
+        return decorator
+
+    def time_sync(
+        self, *label_values: str
+    ) -> Callable[[Callable[P, R]], Callable[P, R]]:
+        """Decorator to observe the duration of a function"""
+
+        def decorator(func: Callable[P, R]) -> Callable[P, R]:
+            @wraps(func)
+            def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *label_values)
+
+            return wrapper
+
+        return decorator
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self.lock:
+            snapshot = [
+                (label_values, list(series.counts), series.sum)
+                for label_values, series in self.series.items()
+            ]
+
+        bounds = [str(bucket) for bucket in self.buckets] + ["+Inf"]
+        for label_values, counts, total in snapshot:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = _labels(
+                    self.labels + ("le",), label_values + (bound,)
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+exceptions_total = Counter(
+    "exceptions_total",
+    "Exceptions handled by the application exception handlers.",
+    ("exception",),
+)
+db_operation_duration = Histogram(
+    "db_operation_duration_seconds",
+    "Database method latency by collection.",
+    ("operation", "collection"),
+)
+password_hashing_duration = Histogram(
+    "password_hashing_duration_seconds",
+    "Password hashing and verification latency, including queueing.",
+    ("operation",),
+)
+token_duration = Histogram(
+    "token_duration_seconds",
+    "JWT creation and decoding latency.",
+    ("operation",),
+)
+mongo_command_duration = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency reported by the driver.",
+    ("command", "collection", "status"),
+)
+
+metrics: list[Counter | Histogram] = [
+    http_request_duration,
+    exceptions_total,
+    db_operation_duration,
+    password_hashing_duration,
+    token_duration,
+    mongo_command_duration,
+]
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    return "".join(
+        f"{line}\n" for metric in metrics for line in metric.render()
+    )
+
+
+def observe_db(
+    operation: str, argument: str = "model"
+) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """
+    Decorator for Database methods,
+    the collection is taken from the model or document argument,
+    passed by position or by keyword
+    """
+
+    def decorator(
+        func: Callable[P, Awaitable[R]]
+    ) -> Callable[P, Awaitable[R]]:
+        position = list(inspect.signature(func).parameters).index(argument)
+
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                target: Any = (
+                    kwargs[argument] if argument in kwargs else args[position]
+                )
+                db_operation_duration.observe(
+                    time.perf_counter() - start,
+                    operation,
+                    target.collection(),
+                )
+
+        return wrapper
+
+    return decorator
+
+
+def count_exceptions(
+    handler: Callable[[Request, Any], Coroutine[Any, Any, Response]]
+) -> Callable[[Request, Any], Coroutine[Any, Any, Response]]:
+    """Wrap an exception handler to count handled exceptions by type"""
+
+    @wraps(handler)
+    async def wrapper(request: Request, exception: Any) -> Response:
+        exceptions_total.inc(type(exception).__name__)
+        return await handler(request, exception)
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    Observe the request latency labelled by the route template,
+    so paths with ids do not make a series per id
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            )
@@ -1,51 +1,89 @@
-from datetime import datetime
-from enum import IntEnum, StrEnum
-from typing import Any
-
-from bson import ObjectId
-from pydantic import BaseModel, ConfigDict, Field
-
-from app.auth.database.types import PyObjectId
-
-
-class BaseDocument(BaseModel):
-    """The base model for all documents in the database"""
-
-    id: PyObjectId | ObjectId = Field(default_factory=ObjectId, alias="_id")
-    created: datetime | None = None
-    updated: datetime | None = None
-
-    model_config = ConfigDict(
-        arbitrary_types_allowed=True,
-        populate_by_name=True,
-        extra="allow",
-    )
-
-
-class SortDirection(IntEnum):
-    ascending = 1
-    descending = -1
-
-
-class ListParams(BaseModel):
-    """The parameters for multiple documents search"""
-
-    sort_key: str = "_id"
-    sort_direction: SortDirection = SortDirection.descending
-    skip: int = Field(0, ge=0)
-    limit: int = Field(0, ge=0)
-
-    model_config = ConfigDict(extra="forbid", frozen=True)
-
-    def to_query(self) -> dict[str, Any]:
-        return {
-            "sort": {self.sort_key: self.sort_direction},
-            "skip": self.skip,
-            "limit": self.limit,
-        }
-
-
-class Collection(StrEnum):
-    users = "users"
-    authorizations = "authorizations"
-    verifications = "verifications"
+from datetime import datetime
+from enum import IntEnum, StrEnum
+from typing import Generic, Self, TypeVar
+
+from bson import ObjectId
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from pymongo import IndexModel
+from pymongo.collation import Collation
+
+from app.auth.database.pagination import decode_cursor
+from app.auth.database.types import PyObjectId
+
+T = TypeVar("T")
+
+
+class BaseDocument(BaseModel):
+    """The base model for all documents in the database"""
+
+    id: PyObjectId | ObjectId = Field(default_factory=ObjectId, alias="_id")
+    created: datetime | None = None
+    updated: datetime | None = None
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+        populate_by_name=True,
+        extra="allow",
+    )
+
+    @classmethod
+    def indexes(cls) -> list[IndexModel]:
+        """Indexes created for the model collection on startup"""
+        return []
+
+    @classmethod
+    def collation(cls) -> Collation | None:
+        """
+        Collation used by all queries to the model collection,
+        string indexes must be created with it to be used by the queries
+        """
+        return None
+
+
+class SortDirection(IntEnum):
+    ascending = 1
+    descending = -1
+
+
+class ListParams(BaseModel):
+    """
+    The parameters for multiple documents search.
+    The cursor is taken from the previous page,
+    the limit is capped by the maximum page size, 0 means the maximum
+    """
+
+    sort_key: str = "_id"
+    sort_direction: SortDirection = SortDirection.descending
+    cursor: str | None = None
+    limit: int = Field(0, ge=0)
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    @model_validator(mode="after")
+    def check_cursor(self) -> Self:
+        if self.cursor and decode_cursor(self.cursor)[0] != self.sort_key:
+            raise ValueError("Cursor does not match the sort key.")
+        return self
+
+
+class Page(BaseModel, Generic[T]):
+    """The page of documents and the cursor to get the next one"""
+
+    items: list[T]
+    next_cursor: str | None = None
+
+
+class BulkUpdateResult(BaseModel):
+    matched: int
+    modified: int
+
+
+class BulkDeleteResult(BaseModel):
+    deleted: int
+
+
+class Collection(StrEnum):
+    users = "users"
+    authorizations = "authorizations"
+    verifications = "verifications"
+    outbox = "outbox"
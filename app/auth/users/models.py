@@ -1,42 +1,177 @@
-from enum import StrEnum
-
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
-
-from app.auth.config import settings
-from app.auth.models import BaseDocument, Collection
-
-
-class RoleType(StrEnum):
-    user = "user"
-    admin = "admin"
-
-
-class BaseUser(BaseModel):
-    username: str
-    password: str = Field(min_length=settings.auth.password_min_length)
-    email: EmailStr
-    roles: list[RoleType]
-
-    model_config = ConfigDict(extra="forbid")
-
-
-class User(BaseUser, BaseDocument):
-    is_active: bool = False
-
-    @classmethod
-    def collection(cls) -> str:
-        return Collection.users
-
-
-class UserCreate(BaseUser):
-    pass
-
-
-class UserUpdate(BaseModel):
-    username: str | None = None
-    password: str | None = None
-    email: EmailStr | None = None
-    roles: list[RoleType] | None = None
-    is_active: bool | None = None
-
-    model_config = ConfigDict(extra="forbid")
+from datetime import datetime
+from enum import StrEnum
+from typing import Any, Self
+
+from bson import ObjectId
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    field_validator,
+    model_validator,
+)
+from pymongo import IndexModel
+from pymongo.collation import Collation, CollationStrength
+
+from app.auth.config import config
+from app.auth.database.types import Email, PyObjectId
+from app.auth.models import BaseDocument, Collection
+
+
+class RoleType(StrEnum):
+    user = "user"
+    admin = "admin"
+
+
+class BaseUser(BaseModel):
+    username: str
+    password: str = Field(min_length=config.auth.password_min_length)
+    email: Email
+    roles: list[RoleType]
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class User(BaseUser, BaseDocument):
+    is_active: bool = False
+
+    @classmethod
+    def collection(cls) -> str:
+        return Collection.users
+
+    @classmethod
+    def indexes(cls) -> list[IndexModel]:
+        return [
+            IndexModel("username", unique=True, collation=cls.collation()),
+            IndexModel("email", unique=True, collation=cls.collation()),
+        ]
+
+    @classmethod
+    def collation(cls) -> Collation:
+        """Compare usernames and emails case-insensitively"""
+        return Collation(locale="en", strength=CollationStrength.SECONDARY)
+
+
+class UserCreate(BaseUser):
+    pass
+
+
+class UserUpdate(BaseModel):
+    """
+    Only the set fields are updated. Users have no nullable fields,
+    so null values are dropped and leave the fields unchanged
+    """
+
+    username: str | None = None
+    password: str | None = None
+    email: Email | None = None
+    roles: list[RoleType] | None = None
+    is_active: bool | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="before")
+    @classmethod
+    def drop_nulls(cls, data: Any) -> Any:
+        if isinstance(data, dict):
+            return {
+                key: value for key, value in data.items() if value is not None
+            }
+        return data
+
+
+class BulkCreateResult(BaseModel):
+    """The created user or the reason it is not created"""
+
+    user: User | None = None
+    error: str | None = None
+
+
+class UserFilter(BaseModel):
+    """Users matching all the set conditions, at least one is required"""
+
+    ids: list[PyObjectId] | None = None
+    usernames: list[str] | None = None
+    emails: list[EmailStr] | None = None
+    roles: list[RoleType] | None = Field(
+        None, description="Users having any of the roles"
+    )
+    is_active: bool | None = None
+    created_before: datetime | None = None
+    created_after: datetime | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+    @field_validator("ids")
+    @classmethod
+    def check_ids(cls, ids: list[str] | None) -> list[str] | None:
+        if ids and not all(ObjectId.is_valid(id) for id in ids):
+            raise ValueError("Invalid user id.")
+        return ids
+
+    @model_validator(mode="after")
+    def check_not_empty(self) -> Self:
+        if all(value is None for value in self.model_dump().values()):
+            raise ValueError("The filter must not be empty.")
+        return self
+
+    def to_query(self) -> dict[str, Any]:
+        query: dict[str, Any] = {}
+        if self.ids is not None:
+            query["_id"] = {"$in": [ObjectId(id) for id in self.ids]}
+        if self.usernames is not None:
+            query["username"] = {"$in": self.usernames}
+        if self.emails is not None:
+            query["email"] = {"$in": self.emails}
+        if self.roles is not None:
+            query["roles"] = {"$in": self.roles}
+        if self.is_active is not None:
+            query["is_active"] = self.is_active
+        if self.created_before or self.created_after:
+            query["created"] = {}
+            if self.created_before:
+                query["created"]["$lt"] = self.created_before
+            if self.created_after:
+                query["created"]["$gte"] = self.created_after
+        return query
+
+
+class UserBulkUpdate(BaseModel):
+    """
+    The fields of the update are set to all matching users.
+    Roles are granted or revoked keeping the other roles of the users,
+    the whole list is not replaced
+    """
+
+    filter: UserFilter
+    update: UserUpdate = Field(default_factory=UserUpdate)
+    add_roles: list[RoleType] | None = None
+    remove_roles: list[RoleType] | None = None
+
+    model_config = ConfigDict(extra="forbid")
+
+    @model_validator(mode="after")
+    def check_update(self) -> Self:
+        changes = self.update.model_dump(exclude_unset=True)
+        if not changes and not self.add_roles and not self.remove_roles:
+            raise ValueError("The update must not be empty.")
+
+        # The same value can't be set to many users
+        # and passwords are changed by users only
+        if fields := sorted(
+            changes.keys() & {"username", "email", "password"}
+        ):
+            raise ValueError(
+                f"Fields {', '.join(fields)} can't be updated in bulk."
+            )
+        if "roles" in changes:
+            raise ValueError(
+                "Roles are updated in bulk by add_roles or remove_roles."
+            )
+        # MongoDB can't add to and pull from one array by one update
+        if self.add_roles and self.remove_roles:
+            raise ValueError(
+                "add_roles and remove_roles can't be used together."
+            )
+        return self
@@ -1,70 +1,133 @@
-from typing import Annotated
-
-from fastapi import APIRouter, Depends, Security
-from pydantic import EmailStr
-from starlette import status
-
-from app.auth.authentication.tokens.services import get_token_data
-from app.auth.models import ListParams
-from app.auth.users.models import User, UserCreate, UserUpdate
-from app.auth.users.services import (
-    create_user,
-    delete_user,
-    get_user,
-    get_user_by_email,
-    get_user_by_name,
-    get_user_list,
-    update_user,
-)
-
-"""User must have "admin" role to access this"""
-users = APIRouter(
-    prefix="/users",
-    tags=["Users"],
-    dependencies=[Security(get_token_data, scopes=["admin"])],
-)
-
-
-@users.get("/{user_id}")
-async def get_user_route(user: Annotated[User, Depends(get_user)]) -> User:
-    return user
-
-
-@users.get("/username/{username}")
-async def get_user_by_name_route(
-    user: Annotated[User, Depends(get_user_by_name)]
-) -> User:
-    return user
-
-
-@users.get("/email/{email}")
-async def get_user_by_email_route(
-    user: Annotated[User, Depends(get_user_by_email)]
-) -> User:
-    return user
-
-
-@users.get("/")
-async def get_user_list_route(
-    params: Annotated[ListParams, Depends()],
-    username: str | None = None,
-    email: EmailStr | None = None,
-) -> list[User]:
-    return await get_user_list(username, email, params)
-
-
-@users.post("/create", status_code=status.HTTP_201_CREATED)
-async def create_user_route(user: UserCreate) -> User:
-    return await create_user(user)
-
-
-@users.patch("/{user_id}")
-async def update_user_route(
-    user: Annotated[User, Depends(get_user)], user_update: UserUpdate
-) -> User:
-    return await update_user(user, user_update)
-
-
-@users.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user_route(user: Annotated[User, Depends(get_user)]) -> None:
-    return await delete_user(user)
+from typing import Annotated
+
+from fastapi import APIRouter, Body, Depends, Query, Security
+from pydantic import EmailStr
+from starlette import status
+from starlette.responses import StreamingResponse
+
+from app.auth.authentication.tokens.services import get_token_data
+from app.auth.cache import CacheStats
+from app.auth.config import config
+from app.auth.database.services import db
+from app.auth.models import (
+    BulkDeleteResult,
+    BulkUpdateResult,
+    ListParams,
+    Page,
+)
+from app.auth.users.models import (
+    BulkCreateResult,
+    User,
+    UserBulkUpdate,
+    UserCreate,
+    UserFilter,
+    UserUpdate,
+)
+from app.auth.users.services import (
+    create_user,
+    create_users,
+    delete_user,
+    delete_users,
+    export_users,
+    get_user,
+    get_user_by_email,
+    get_user_by_name,
+    get_user_list,
+    update_user,
+    update_users,
+)
+
+"""User must have "admin" role to access this"""
+users = APIRouter(
+    prefix="/users",
+    tags=["Users"],
+    dependencies=[Security(get_token_data, scopes=["admin"])],
+)
+
+
+@users.get("/export", response_class=StreamingResponse)
+async def export_users_route(
+    fields: Annotated[list[str] | None, Query()] = None,
+    batch_size: Annotated[
+        int, Query(gt=0, le=config.export.max_batch_size)
+    ] = config.export.batch_size,
+) -> StreamingResponse:
+    """Stream all users as newline-delimited JSON"""
+    return StreamingResponse(
+        export_users(fields, batch_size), media_type="application/x-ndjson"
+    )
+
+
+@users.get("/cache/stats")
+async def get_cache_stats_route() -> CacheStats:
+    return db.cache.stats()
+
+
+@users.get("/{user_id}")
+async def get_user_route(user: Annotated[User, Depends(get_user)]) -> User:
+    return user
+
+
+@users.get("/username/{username}")
+async def get_user_by_name_route(
+    user: Annotated[User, Depends(get_user_by_name)]
+) -> User:
+    return user
+
+
+@users.get("/email/{email}")
+async def get_user_by_email_route(
+    user: Annotated[User, Depends(get_user_by_email)]
+) -> User:
+    return user
+
+
+@users.get("/")
+async def get_user_list_route(
+    params: Annotated[ListParams, Depends()],
+    username: str | None = None,
+    email: EmailStr | None = None,
+) -> Page[User]:
+    return await get_user_list(username, email, params)
+
+
+@users.post("/create", status_code=status.HTTP_201_CREATED)
+async def create_user_route(user: UserCreate) -> User:
+    return await create_user(user)
+
+
+@users.post("/bulk")
+async def create_users_route(
+    users_create: Annotated[
+        list[UserCreate], Body(max_length=config.users.bulk_max_users)
+    ]
+) -> list[BulkCreateResult]:
+    """Create users, the results are in the order of the request"""
+    return await create_users(users_create)
+
+
+@users.patch("/bulk")
+async def update_users_route(bulk_update: UserBulkUpdate) -> BulkUpdateResult:
+    """
+    Update all users matching the filter by one operation.
+    Roles are granted by add_roles and revoked by remove_roles
+    """
+    return await update_users(bulk_update)
+
+
+@users.delete("/bulk")
+async def delete_users_route(user_filter: UserFilter) -> BulkDeleteResult:
+    """Delete all users matching the filter with their sessions"""
+    return await delete_users(user_filter)
+
+
+@users.patch("/{user_id}")
+async def update_user_route(
+    user: Annotated[User, Depends(get_user)], user_update: UserUpdate
+) -> User:
+    return await update_user(user, user_update)
+
+
+@users.delete("/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_user_route(user: Annotated[User, Depends(get_user)]) -> None:
+    return await delete_user(user)
@@ -1,61 +1,184 @@
-from typing import Annotated
-
-from bson import ObjectId
-from fastapi import Security
-from pydantic import EmailStr
-
-from app.auth.authentication.tokens.models import TokenData
-from app.auth.authentication.tokens.services import get_token_data
-from app.auth.authentication.utils import get_password_hash
-from app.auth.database.services import db
-from app.auth.database.types import PyObjectId
-from app.auth.models import ListParams
-from app.auth.users.models import User, UserCreate, UserUpdate
-
-
-async def get_user(user_id: PyObjectId) -> User:
-    return await db.find(User, {"_id": ObjectId(user_id)}, True)
-
-
-async def get_user_by_name(username: str) -> User:
-    return await db.find(
-        User, {"username": {"$regex": username, "$options": "i"}}, True
-    )
-
-
-async def get_user_by_email(email: EmailStr) -> User:
-    return await db.find(User, {"email": email}, True)
-
-
-async def get_user_list(
-    username: str | None, email: EmailStr | None, params: ListParams
-) -> list[User]:
-    query = (
-        {"username": {"$regex": username, "$options": "i"}}
-        if username
-        else (
-            {} | {"email": {"$regex": email, "$options": "i"}} if email else {}
-        )
-    )
-    return await db.find_many(User, query, **params.to_query())
-
-
-async def create_user(user_create: UserCreate) -> User:
-    user = User(**user_create.model_dump())
-    return await db.insert(
-        user.model_copy(update={"password": get_password_hash(user.password)})
-    )
-
-
-async def update_user(user: User, update: UserUpdate) -> User:
-    update_dict = update.model_dump(exclude_none=True)
-    updated_user = user.model_copy(update=update_dict)
-    user = await db.replace(updated_user)
-    return user
-
-
-async def delete_user(user: User) -> None:
-    await db.delete(user)
-
-
-CurrentUser = Annotated[TokenData, Security(get_token_data, scopes=["user"])]
+import asyncio
+import json
+from datetime import datetime
+from typing import Annotated, Any, AsyncIterator
+
+from fastapi import Security
+from pydantic import EmailStr
+
+from app.auth.authentication.models import Authorization
+from app.auth.authentication.tokens.models import TokenData
+from app.auth.authentication.tokens.services import get_token_data
+from app.auth.authentication.utils import hash_password, hash_passwords
+from app.auth.database.services import db
+from app.auth.database.types import PyObjectId
+from app.auth.models import (
+    BulkDeleteResult,
+    BulkUpdateResult,
+    ListParams,
+    Page,
+)
+from app.auth.users.models import (
+    BulkCreateResult,
+    User,
+    UserBulkUpdate,
+    UserCreate,
+    UserFilter,
+    UserUpdate,
+)
+from app.auth.verification.models import Verification
+
+
+async def get_user(user_id: PyObjectId) -> User:
+    return await db.get(User, user_id)
+
+
+def prefix_query(prefix: str) -> dict[str, str]:
+    """
+    Match strings starting with the prefix by a range, so the index is used.
+    U+FFFF has the highest collation weight, it closes the range
+    """
+    return {"$gte": prefix, "$lt": prefix + "\uffff"}
+
+
+async def get_user_by_name(username: str) -> User:
+    return await db.find(User, {"username": username}, True)
+
+
+async def get_user_by_email(email: EmailStr) -> User:
+    return await db.find(User, {"email": email}, True)
+
+
+async def get_user_list(
+    username: str | None, email: EmailStr | None, params: ListParams
+) -> Page[User]:
+    query: dict[str, Any] = (
+        {"username": prefix_query(username)}
+        if username
+        else ({"email": email} if email else {})
+    )
+    return await db.find_page(User, query, params)
+
+
+def _encode(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+async def export_users(
+    fields: list[str] | None, batch_size: int
+) -> AsyncIterator[bytes]:
+    """
+    Encode users as newline-delimited JSON right from the database cursor,
+    one chunk per batch, so memory usage doesn't depend on the users count.
+    Password hashes are exported only if they are in the requested fields
+    """
+    projection = dict.fromkeys(fields, True) if fields else {"password": False}
+
+    lines = []
+    async for document in db.stream(User, {}, projection, batch_size):
+        lines.append(json.dumps(document, default=_encode).encode())
+        if len(lines) == batch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+async def create_user(user_create: UserCreate) -> User:
+    user = User(**user_create.model_dump())
+    return await db.insert(
+        user.model_copy(
+            update={"password": await hash_password(user.password)}
+        )
+    )
+
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _insertion_error(write_error: dict[str, Any]) -> str:
+    if write_error["code"] == DUPLICATE_KEY_ERROR:
+        # keyValue is not reported by servers before MongoDB 4.2
+        if key_value := write_error.get("keyValue"):
+            return f"User {next(iter(key_value.values()))} already exists."
+        return "User already exists."
+    return str(write_error["errmsg"])
+
+
+async def create_users(
+    users_create: list[UserCreate],
+) -> list[BulkCreateResult]:
+    """
+    Hash passwords in parallel by the hashing pool
+    and insert all users by one unordered write.
+    Return results in the order of the users
+    """
+    passwords = await hash_passwords(
+        [user_create.password for user_create in users_create]
+    )
+    new_users = [
+        User(**user_create.model_dump() | {"password": password})
+        for user_create, password in zip(users_create, passwords)
+    ]
+    inserted, errors = await db.insert_many(new_users)
+
+    return [
+        (
+            BulkCreateResult(error=_insertion_error(errors[index]))
+            if index in errors
+            else BulkCreateResult(user=user)
+        )
+        for index, user in enumerate(inserted)
+    ]
+
+
+async def update_users(bulk_update: UserBulkUpdate) -> BulkUpdateResult:
+    operators: dict[str, Any] = {}
+    if bulk_update.add_roles:
+        operators["$addToSet"] = {"roles": {"$each": bulk_update.add_roles}}
+    if bulk_update.remove_roles:
+        operators["$pull"] = {"roles": {"$in": bulk_update.remove_roles}}
+
+    return await db.update_many(
+        User, bulk_update.filter.to_query(), bulk_update.update, operators
+    )
+
+
+async def delete_user_sessions(user_ids: list[str]) -> None:
+    """
+    Delete authorizations and verifications of the users,
+    so their refresh tokens and codes stop working
+    """
+    await asyncio.gather(
+        db.delete_many(Authorization, {"user_id": {"$in": user_ids}}),
+        db.delete_many(Verification, {"user._id": {"$in": user_ids}}),
+    )
+
+
+async def delete_users(user_filter: UserFilter) -> BulkDeleteResult:
+    """
+    Delete all users matching the filter with their sessions.
+    The users are found first, so the sessions are deleted by the same ids
+    """
+    ids = await db.distinct(User, "_id", user_filter.to_query())
+    if not ids:
+        return BulkDeleteResult(deleted=0)
+
+    result = await db.delete_many(User, {"_id": {"$in": ids}})
+    await delete_user_sessions([str(id) for id in ids])
+    return result
+
+
+async def update_user(user: User, update: UserUpdate) -> User:
+    return await db.update(User, user.id, update)
+
+
+async def delete_user(user: User) -> None:
+    await db.delete(user)
+    await delete_user_sessions([str(user.id)])
+
+
+CurrentUser = Annotated[TokenData, Security(get_token_data, scopes=["user"])]
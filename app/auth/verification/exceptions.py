@@ -1,5 +1,5 @@
-from app.auth.exceptions import BaseAuthException
-
-
-class VerificationError(BaseAuthException):
-    pass
+from app.auth.exceptions import BaseAuthException
+
+
+class VerificationError(BaseAuthException):
+    pass
@@ -1,41 +1,57 @@
-from datetime import datetime
-from enum import StrEnum
-
-from pydantic import BaseModel, ConfigDict
-
-from app.auth.models import BaseDocument, Collection
-from app.auth.users.models import User, UserUpdate
-
-
-class ActionType(StrEnum):
-    signup = "signup"
-    email = "email"
-    password = "password"
-
-
-class VerificationAction(BaseModel):
-    """Specify user model fields that will be updated depending on action"""
-
-    action_type: ActionType
-    data: UserUpdate
-
-
-class BaseVerification(BaseDocument):
-    user: User
-    exp_date: datetime
-    resend_date: datetime
-    action: VerificationAction
-
-    model_config = ConfigDict(extra="forbid")
-
-
-class Verification(BaseVerification):
-    code: str
-
-    @classmethod
-    def collection(cls) -> str:
-        return Collection.verifications
-
-
-class VerificationOut(BaseVerification):
-    pass
+from datetime import datetime
+from enum import StrEnum
+
+from pydantic import BaseModel, ConfigDict
+from pymongo import IndexModel
+
+from app.auth.config import config
+from app.auth.models import BaseDocument, Collection
+from app.auth.users.models import User, UserUpdate
+
+
+class ActionType(StrEnum):
+    signup = "signup"
+    email = "email"
+    password = "password"
+
+
+class VerificationAction(BaseModel):
+    """Specify user model fields that will be updated depending on action"""
+
+    action_type: ActionType
+    data: UserUpdate
+
+
+class BaseVerification(BaseDocument):
+    user: User
+    exp_date: datetime
+    resend_date: datetime
+    action: VerificationAction
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class Verification(BaseVerification):
+    code: str
+
+    @classmethod
+    def collection(cls) -> str:
+        return Collection.verifications
+
+    @classmethod
+    def indexes(cls) -> list[IndexModel]:
+        # Keep expired verifications until resend is allowed,
+        # otherwise removing them would bypass the resend timeout
+        ttl_minutes = max(
+            config.auth.verification_resend_minutes
+            - config.auth.verification_exp_minutes,
+            0,
+        )
+        return [
+            IndexModel(["user._id", "action.action_type"]),
+            IndexModel("exp_date", expireAfterSeconds=ttl_minutes * 60),
+        ]
+
+
+class VerificationOut(BaseVerification):
+    pass
@@ -0,0 +1,254 @@
+"""
+Load benchmark of login, refresh, me and signup
+with the app running in process, the same way as the tests.
+The mail sender is stubbed, MongoDB is a local mongod
+or the in-memory mongomock-motor (installed separately).
+Usage: python -m benchmarks.load [-h]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import httpx
+from asgi_lifespan import LifespanManager
+from bson import ObjectId
+
+from app.auth import app
+from app.auth.authentication.utils import hash_password
+from app.auth.database.services import db
+from app.auth.mail.models import OutboxMessage
+from app.auth.mail.services import outbox_worker
+from app.auth.users.models import RoleType, User
+
+PASSWORD = "27.:^:.Cl"
+
+Scenario = Callable[[httpx.AsyncClient, "VirtualUser", int], Awaitable[int]]
+
+
+class VirtualUser:
+    """The account used by one concurrent client"""
+
+    def __init__(self, user: User) -> None:
+        self.user = user
+        self.access_token = ""
+        self.refresh_token = ""
+
+    async def login(self, client: httpx.AsyncClient) -> int:
+        response = await client.post(
+            "/auth/login",
+            json={"username": self.user.username, "password": PASSWORD},
+        )
+        if response.status_code == 200:
+            self.access_token = response.json()["access_token"]
+            self.refresh_token = response.json()["refresh_token"]
+        return response.status_code
+
+
+async def login(client: httpx.AsyncClient, user: VirtualUser, _: int) -> int:
+    return await user.login(client)
+
+
+async def refresh(client: httpx.AsyncClient, user: VirtualUser, _: int) -> int:
+    # Refresh tokens are rotated, every client uses its own chain
+    response = await client.post(
+        "/auth/refresh", json={"refresh_token": user.refresh_token}
+    )
+    if response.status_code == 200:
+        user.refresh_token = response.json()["refresh_token"]
+    return response.status_code
+
+
+async def me(client: httpx.AsyncClient, user: VirtualUser, _: int) -> int:
+    response = await client.get(
+        "/profiles/me",
+        headers={"Authorization": f"Bearer {user.access_token}"},
+    )
+    return response.status_code
+
+
+async def signup(
+    client: httpx.AsyncClient, _: VirtualUser, number: int
+) -> int:
+    name = f"signup{number}{ObjectId()}"
+    response = await client.post(
+        "/auth/signup",
+        json={
+            "username": name,
+            "password": PASSWORD,
+            "email": f"{name}@example.com",
+        },
+    )
+    return response.status_code
+
+
+scenarios: dict[str, Scenario] = {
+    "login": login,
+    "refresh": refresh,
+    "me": me,
+    "signup": signup,
+}
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if len(values) < 2:
+        values = values * 2 or [0.0, 0.0]
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        "p50": round(cuts[49], 3),
+        "p95": round(cuts[94], 3),
+        "p99": round(cuts[98], 3),
+        "max": round(max(values), 3),
+    }
+
+
+async def measure_loop_lag(lags: list[float], interval: float) -> None:
+    """Collect how late the loop wakes up a sleeping task, in ms"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - start - interval) * 1000)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    users: list[VirtualUser],
+    requests: int,
+) -> dict[str, Any]:
+    """
+    Send the requests by one concurrent client per user.
+    Return throughput, latency and event loop lag
+    """
+    latencies: list[float] = []
+    lags: list[float] = []
+    errors: dict[str, int] = {}
+    numbers = iter(range(requests))
+
+    async def run_client(user: VirtualUser) -> None:
+        for number in numbers:
+            start = time.perf_counter()
+            status_code = await scenario(client, user, number)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status_code >= 400:
+                errors[str(status_code)] = errors.get(str(status_code), 0) + 1
+
+    lag_task = asyncio.create_task(measure_loop_lag(lags, 0.01))
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(user) for user in users))
+    duration = time.perf_counter() - start
+    lag_task.cancel()
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 1),
+        "latency_ms": percentiles(latencies),
+        "loop_lag_ms": percentiles(lags),
+    }
+
+
+def use_memory_database() -> None:
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit(
+            "The memory backend needs mongomock-motor: "
+            "pip install mongomock-motor"
+        )
+
+    db.client = AsyncMongoMockClient()
+
+
+async def no_mail(_message: OutboxMessage) -> None:
+    return None
+
+
+async def create_users(count: int) -> list[VirtualUser]:
+    password = await hash_password(PASSWORD)
+    users, errors = await db.insert_many(
+        [
+            User(
+                username=f"bench{index}",
+                password=password,
+                email=f"bench{index}@example.com",
+                roles=[RoleType.user],
+                is_active=True,
+            )
+            for index in range(count)
+        ]
+    )
+    if errors:
+        raise RuntimeError(f"Benchmark users are not created: {errors}")
+    return [VirtualUser(user) for user in users]
+
+
+async def main(args: argparse.Namespace) -> dict[str, Any]:
+    if args.backend == "memory":
+        use_memory_database()
+    database_name = f"benchmark_{ObjectId()}"
+    db.database = db.client[database_name]
+    outbox_worker.sender = no_mail
+
+    results: dict[str, Any] = {
+        "date": datetime.now(UTC).isoformat(),
+        "backend": args.backend,
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+        "scenarios": {},
+    }
+    try:
+        async with LifespanManager(app) as manager:
+            async with httpx.AsyncClient(
+                transport=httpx.ASGITransport(app=manager.app),  # type: ignore
+                base_url="http://benchmark",
+            ) as client:
+                users = await create_users(args.concurrency)
+                # Tokens for refresh and me
+                await asyncio.gather(*(user.login(client) for user in users))
+
+                for name in args.scenarios:
+                    results["scenarios"][name] = await run_scenario(
+                        client, scenarios[name], users, args.requests
+                    )
+                    print(name, json.dumps(results["scenarios"][name]))
+    finally:
+        await db.client.drop_database(database_name)
+
+    return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--backend", choices=["mongo", "memory"], default="mongo"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--requests", type=int, default=500, help="Requests per scenario"
+    )
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        choices=list(scenarios),
+        default=list(scenarios),
+    )
+    parser.add_argument(
+        "--output", type=Path, help="Save the results as JSON to the file"
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
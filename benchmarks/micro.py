@@ -0,0 +1,234 @@
+"""
+Per-call cost of the per-request hot paths without a database:
+tokens, scope checks, bcrypt verification and document models.
+The results are compared with the committed baseline,
+the exit code is 1 if any benchmark is slower than the threshold.
+On another host the times are scaled by the reference benchmark.
+Usage: python -m benchmarks.micro [-h]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any, Callable, Coroutine
+
+from bson import ObjectId
+from fastapi.security import HTTPAuthorizationCredentials, SecurityScopes
+
+from app.auth.authentication.tokens.codec import token_codec
+from app.auth.authentication.tokens.models import BaseTokenData
+from app.auth.authentication.tokens.services import (
+    create_token_pair,
+    decode_token,
+    get_token_data,
+)
+from app.auth.authentication.utils import _verify, pwd_context
+from app.auth.database.services import Database
+from app.auth.users.models import User
+from app.auth.verification.models import Verification
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+"""bcrypt costs to verify, 12 is the passlib default used for hashing"""
+BCRYPT_ROUNDS = (10, 12)
+
+"""Pure Python work that only depends on the host speed"""
+REFERENCE = "reference"
+
+PASSWORD = "27.:^:.Cl"
+
+Benchmark = tuple[str, Callable[[], object], int]
+
+
+def run(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    """Run a coroutine that does not suspend, without the event loop"""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("The coroutine is suspended.")
+
+
+def user_document() -> dict[str, Any]:
+    """A user as it is read from MongoDB"""
+    return {
+        "_id": ObjectId(),
+        "created": datetime.now(timezone.utc),
+        "updated": None,
+        "username": "username",
+        "password": pwd_context.hash(PASSWORD, rounds=4),
+        "email": "username@example.com",
+        "roles": ["user", "admin"],
+        "is_active": True,
+    }
+
+
+def verification_document() -> dict[str, Any]:
+    """A verification as it is read from MongoDB"""
+    now = datetime.now(timezone.utc)
+    return {
+        "_id": ObjectId(),
+        "created": now,
+        "updated": None,
+        "user": user_document(),
+        "exp_date": now + timedelta(minutes=10),
+        "resend_date": now + timedelta(minutes=1),
+        "action": {
+            "action_type": "email",
+            "data": {"email": "new@example.com"},
+        },
+        "code": "123456",
+    }
+
+
+def verify(rounds: int) -> Callable[[], bool]:
+    hashed = pwd_context.hash(PASSWORD, rounds=rounds)
+    return lambda: _verify(PASSWORD, hashed)
+
+
+def benchmarks() -> list[Benchmark]:
+    data = BaseTokenData(user_id=str(ObjectId()), scopes=["user", "admin"])
+    token = create_token_pair(data).access_token
+    credentials = HTTPAuthorizationCredentials(
+        scheme="Bearer", credentials=token
+    )
+    scopes = SecurityScopes(["admin"])
+    user = user_document()
+    verification = verification_document()
+
+    return [
+        (REFERENCE, lambda: sorted(range(1000), key=str), 2000),
+        ("create_token_pair", lambda: create_token_pair(data), 2000),
+        ("token_codec.decode", lambda: token_codec.decode(token), 2000),
+        ("decode_token cached", lambda: decode_token(token), 20000),
+        (
+            "get_token_data",
+            lambda: run(get_token_data(scopes, credentials)),
+            20000,
+        ),
+        ("User strict validation", lambda: User(**user), 20000),
+        (
+            "Verification strict validation",
+            lambda: Verification(**verification),
+            10000,
+        ),
+        ("User hydrate", lambda: Database.hydrate(User, user), 20000),
+        (
+            "Verification hydrate",
+            lambda: Database.hydrate(Verification, verification),
+            10000,
+        ),
+    ] + [
+        (f"verify_password rounds={rounds}", verify(rounds), 1)
+        for rounds in BCRYPT_ROUNDS
+    ]
+
+
+def measure(func: Callable[[], object], number: int, repeat: int) -> float:
+    """The best time of the repeats, in microseconds per call"""
+    seconds = min(timeit.repeat(func, number=number, repeat=repeat))
+    return seconds / number * 1_000_000
+
+
+def host() -> dict[str, str]:
+    """The machine the results are measured on"""
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "python": platform.python_version(),
+    }
+
+
+def compare(
+    results: dict[str, float],
+    baseline: dict[str, float],
+    threshold: float,
+    scale: float = 1.0,
+) -> list[str]:
+    """
+    Return names of benchmarks slower than the baseline by the threshold.
+    Params:
+        scale: ratio of the reference time to the baseline one,
+               the baseline is measured on another host
+    """
+    return [
+        name
+        for name, microseconds in results.items()
+        if name in baseline
+        and name != REFERENCE
+        and microseconds > baseline[name] * scale * threshold
+    ]
+
+
+def main(args: argparse.Namespace) -> int:
+    saved: dict[str, Any] = {}
+    if args.baseline.exists() and not args.save:
+        saved = json.loads(args.baseline.read_text())
+    baseline: dict[str, float] = saved.get("results", {})
+
+    results = {}
+    for name, func, number in benchmarks():
+        results[name] = round(measure(func, number, args.repeat), 2)
+        change = ""
+        if name in baseline:
+            change = f"{results[name] / baseline[name]:>8.2f}x"
+        print(f"{name:<30}{results[name]:>12.2f} us{change}")
+
+    if args.save:
+        args.baseline.write_text(
+            json.dumps(
+                {
+                    "host": host(),
+                    "packages": {
+                        package: version(package)
+                        for package in ("pydantic", "pyjwt", "passlib")
+                    },
+                    "results": results,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+        return 0
+
+    scale = 1.0
+    if saved and saved.get("host") != host():
+        if REFERENCE not in baseline:
+            print("Warning: the baseline is from another host, skipped.")
+            return 0
+        scale = results[REFERENCE] / baseline[REFERENCE]
+        print(
+            "Warning: the baseline is from another host, "
+            f"its times are scaled by the reference x{scale:.2f}."
+        )
+
+    if slower := compare(results, baseline, args.threshold, scale):
+        print(f"Slower than the baseline x{args.threshold}: {slower}")
+        return 1
+    return 0
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument(
+        "--save", action="store_true", help="Replace the baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Allowed ratio to the baseline time",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
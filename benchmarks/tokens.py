@@ -0,0 +1,79 @@
+"""
+Per-token cost of the token codec against the generic PyJWT path
+with the configured signing key.
+Usage: python -m benchmarks.tokens [number]
+"""
+
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+import jwt
+from bson import ObjectId
+
+from app.auth.authentication.tokens.codec import token_codec
+from app.auth.authentication.tokens.keys import key_set
+from app.auth.authentication.tokens.models import (
+    BaseTokenData,
+    TokenData,
+    TokenType,
+)
+
+data = BaseTokenData(user_id=str(ObjectId()), scopes=["user", "admin"])
+
+
+def exp_date() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=10)
+
+
+def pyjwt_encode() -> str:
+    token_data = TokenData(
+        **data.model_dump(), token_type=TokenType.access, exp=exp_date()
+    )
+    token: str = jwt.encode(
+        token_data.model_dump(),
+        key_set.signing_key,
+        algorithm=key_set.algorithm,
+        headers=key_set.headers,
+    )
+    return token
+
+
+def pyjwt_decode(token: str) -> TokenData:
+    key_id = jwt.get_unverified_header(token).get("kid")
+    return TokenData(
+        **jwt.decode(
+            token,
+            key_set.verification_key(key_id),
+            algorithms=[key_set.algorithm],
+        )
+    )
+
+
+def codec_encode() -> str:
+    return token_codec.encode(data, TokenType.access, exp_date())
+
+
+def measure(name: str, func: Callable[[], object], number: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    microseconds = seconds / number * 1_000_000
+    print(f"{name:<16}{microseconds:>10.2f} us/token")
+    return microseconds
+
+
+def main(number: int) -> None:
+    print(f"{key_set.algorithm}, best of 5 x {number}")
+    token = codec_encode()
+
+    pyjwt = measure("pyjwt encode", pyjwt_encode, number)
+    codec = measure("codec encode", codec_encode, number)
+    print(f"{'encode speedup':<16}{pyjwt / codec:>10.2f}x")
+
+    pyjwt = measure("pyjwt decode", lambda: pyjwt_decode(token), number)
+    codec = measure("codec decode", lambda: token_codec.decode(token), number)
+    print(f"{'decode speedup':<16}{pyjwt / codec:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
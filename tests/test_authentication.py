@@ -1,77 +1,316 @@
-from bson import ObjectId
-from fastapi.encoders import jsonable_encoder
-from httpx import AsyncClient
-
-from app.auth.authentication.models import LoginData, SignupData
-from app.auth.authentication.tokens.models import TokenPair
-from app.auth.database.services import Database
-from app.auth.users.models import User
-from app.auth.verification.models import Verification, VerificationOut
-
-
-async def test_signup(
-    app: AsyncClient, signup_data: SignupData, db: Database
-) -> None:
-    response = await app.post(
-        "/auth/signup", json=jsonable_encoder(signup_data)
-    )
-    assert response.status_code == 200
-    assert VerificationOut(**response.json())
-    await db.find(
-        Verification,
-        {"_id": ObjectId(response.json().get("_id"))},
-        exception=True,
-    )
-
-
-async def test_signup_already_exists(
-    app: AsyncClient, signup_data: SignupData, db: Database, user: User
-) -> None:
-    response = await app.post(
-        "/auth/signup", json=jsonable_encoder(signup_data)
-    )
-    assert response.status_code == 422
-
-
-async def test_login(app: AsyncClient, login_data: LoginData) -> None:
-    response = await app.post("/auth/login", json=jsonable_encoder(login_data))
-    assert response.status_code == 200
-    assert TokenPair(**response.json())
-
-
-async def test_login_invalid_user(
-    app: AsyncClient, login_data: LoginData, user: User, db: Database
-) -> None:
-    await db.replace(user.model_copy(update={"is_active": False}))
-    response = await app.post("/auth/login", json=jsonable_encoder(login_data))
-    assert response.status_code == 401
-    assert response.json()["detail"] == "User is not verified."
-
-
-async def test_login_incorrect_password(
-    app: AsyncClient, login_data: LoginData
-) -> None:
-    login_data.password = "password"
-    response = await app.post("/auth/login", json=jsonable_encoder(login_data))
-    assert response.status_code == 401
-    assert response.json()["detail"] == "Incorrect password."
-
-
-async def test_logout(
-    user_app: AsyncClient, user_token_pair: TokenPair
-) -> None:
-    response = await user_app.post(
-        "/auth/logout", json={"refresh_token": user_token_pair.refresh_token}
-    )
-    assert response.status_code == 401
-    assert response.json() is None
-
-
-async def test_refresh(
-    user_app: AsyncClient, user_token_pair: TokenPair
-) -> None:
-    response = await user_app.post(
-        "/auth/refresh", json={"refresh_token": user_token_pair.refresh_token}
-    )
-    assert response.status_code == 200
-    assert TokenPair(**response.json())
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import jwt
+import pytest
+from bson import ObjectId
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from fastapi.encoders import jsonable_encoder
+from httpx import AsyncClient
+
+from app.auth.authentication import routes as auth_routes
+from app.auth.authentication.exceptions import HashingQueueFullError
+from app.auth.authentication.models import LoginData, SignupData
+from app.auth.authentication.tokens import services as token_services
+from app.auth.authentication.tokens.codec import TokenCodec
+from app.auth.authentication.tokens.keys import KeySet
+from app.auth.authentication.tokens.models import (
+    BaseTokenData,
+    TokenData,
+    TokenPair,
+    TokenType,
+)
+from app.auth.authentication.tokens.services import decode_token
+from app.auth.authentication.utils import PasswordHasher, _hash
+from app.auth.database.services import Database
+from app.auth.mail.models import OutboxMessage
+from app.auth.users.models import User
+from app.auth.verification.models import Verification, VerificationOut
+
+
+async def test_signup(
+    app: AsyncClient, signup_data: SignupData, db: Database
+) -> None:
+    response = await app.post(
+        "/auth/signup", json=jsonable_encoder(signup_data)
+    )
+    assert response.status_code == 200
+    assert VerificationOut(**response.json())
+    verification = await db.find(
+        Verification,
+        {"_id": ObjectId(response.json().get("_id"))},
+        exception=True,
+    )
+    await db.find(
+        OutboxMessage,
+        {"recipients": signup_data.email, "body": verification.code},
+        exception=True,
+    )
+
+
+async def test_signup_already_exists(
+    app: AsyncClient, signup_data: SignupData, db: Database, user: User
+) -> None:
+    response = await app.post(
+        "/auth/signup", json=jsonable_encoder(signup_data)
+    )
+    assert response.status_code == 422
+
+
+async def test_login(app: AsyncClient, login_data: LoginData) -> None:
+    response = await app.post("/auth/login", json=jsonable_encoder(login_data))
+    assert response.status_code == 200
+    assert TokenPair(**response.json())
+
+
+async def test_login_invalid_user(
+    app: AsyncClient, login_data: LoginData, user: User, db: Database
+) -> None:
+    await db.replace(user.model_copy(update={"is_active": False}))
+    response = await app.post("/auth/login", json=jsonable_encoder(login_data))
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User is not verified."
+
+
+async def test_login_incorrect_password(
+    app: AsyncClient, login_data: LoginData
+) -> None:
+    login_data.password = "password"
+    response = await app.post("/auth/login", json=jsonable_encoder(login_data))
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Incorrect password."
+
+
+async def test_logout(
+    user_app: AsyncClient, user_token_pair: TokenPair
+) -> None:
+    response = await user_app.post(
+        "/auth/logout", json={"refresh_token": user_token_pair.refresh_token}
+    )
+    assert response.status_code == 401
+    assert response.json() is None
+
+
+async def test_refresh(
+    user_app: AsyncClient, user_token_pair: TokenPair
+) -> None:
+    response = await user_app.post(
+        "/auth/refresh", json={"refresh_token": user_token_pair.refresh_token}
+    )
+    assert response.status_code == 200
+    assert TokenPair(**response.json())
+
+
+async def test_refresh_replay(
+    user_app: AsyncClient, user_token_pair: TokenPair
+) -> None:
+    responses = await asyncio.gather(
+        *(
+            user_app.post(
+                "/auth/refresh",
+                json={"refresh_token": user_token_pair.refresh_token},
+            )
+            for _ in range(2)
+        )
+    )
+    assert sorted(response.status_code for response in responses) == [
+        200,
+        404,
+    ]
+
+
+async def test_password_hasher_queue_full(plain_password: str) -> None:
+    hasher = PasswordHasher("thread", max_workers=1, max_pending=0)
+    with pytest.raises(HashingQueueFullError):
+        await hasher.run(_hash, plain_password)
+
+
+async def test_password_hasher_map() -> None:
+    hasher = PasswordHasher("thread", max_workers=2, max_pending=2)
+    assert await hasher.map(str.upper, ["a", "b", "c", "d"]) == [
+        "A",
+        "B",
+        "C",
+        "D",
+    ]
+    hasher.shutdown()
+
+
+async def test_decode_token_cached(user_token_pair: TokenPair) -> None:
+    token_data = decode_token(user_token_pair.access_token)
+    assert decode_token(user_token_pair.access_token) is token_data
+
+
+async def test_jwks(app: AsyncClient) -> None:
+    response = await app.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}
+    assert "max-age" in response.headers["cache-control"]
+
+
+def private_pem(key: rsa.RSAPrivateKey | ed25519.Ed25519PrivateKey) -> str:
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+def public_pem(key: rsa.RSAPrivateKey | ed25519.Ed25519PrivateKey) -> str:
+    return (
+        key.public_key()
+        .public_bytes(
+            serialization.Encoding.PEM,
+            serialization.PublicFormat.SubjectPublicKeyInfo,
+        )
+        .decode()
+    )
+
+
+@pytest.mark.parametrize(
+    "algorithm, old_key, new_key",
+    [
+        (
+            "RS256",
+            rsa.generate_private_key(65537, 2048),
+            rsa.generate_private_key(65537, 2048),
+        ),
+        (
+            "EdDSA",
+            ed25519.Ed25519PrivateKey.generate(),
+            ed25519.Ed25519PrivateKey.generate(),
+        ),
+    ],
+)
+async def test_asymmetric_key_rotation(
+    monkeypatch: pytest.MonkeyPatch,
+    app: AsyncClient,
+    user: User,
+    algorithm: str,
+    old_key: rsa.RSAPrivateKey | ed25519.Ed25519PrivateKey,
+    new_key: rsa.RSAPrivateKey | ed25519.Ed25519PrivateKey,
+) -> None:
+    data = BaseTokenData(user_id=user.id, scopes=user.roles)
+    old_key_set = KeySet(algorithm, None, {"old": private_pem(old_key)}, "old")
+    monkeypatch.setattr(token_services, "token_codec", TokenCodec(old_key_set))
+    old_token = token_services.create_token(data, TokenType.access, 1)
+
+    new_key_set = KeySet(
+        algorithm,
+        None,
+        {"new": private_pem(new_key), "old": public_pem(old_key)},
+        "new",
+    )
+    monkeypatch.setattr(token_services, "token_codec", TokenCodec(new_key_set))
+    monkeypatch.setattr(auth_routes, "key_set", new_key_set)
+    new_token = token_services.create_token(data, TokenType.access, 1)
+    assert jwt.get_unverified_header(new_token)["kid"] == "new"
+    assert decode_token(old_token).user_id == user.id
+    assert decode_token(new_token).user_id == user.id
+
+    response = await app.get("/.well-known/jwks.json")
+    jwks = {jwk["kid"]: jwk for jwk in response.json()["keys"]}
+    assert set(jwks) == {"old", "new"}
+    assert jwt.decode(
+        new_token, jwt.PyJWK(jwks["new"]).key, algorithms=[algorithm]
+    )
+
+
+def test_token_codec_interoperability(secret_key: str) -> None:
+    codec = TokenCodec(KeySet("HS256", secret_key))
+    data = BaseTokenData(user_id=str(ObjectId()), scopes=["user"])
+    exp = datetime.now(UTC).replace(microsecond=0) + timedelta(minutes=1)
+
+    token = codec.encode(data, TokenType.access, exp)
+    assert token == jwt.encode(
+        {**data.model_dump(), "token_type": "access", "exp": exp},
+        secret_key,
+        algorithm="HS256",
+    )
+    assert jwt.decode(token, secret_key, algorithms=["HS256"])["exp"] == (
+        exp.timestamp()
+    )
+
+    foreign_token = jwt.encode(
+        {**data.model_dump(), "token_type": "access", "exp": exp},
+        secret_key,
+        algorithm="HS256",
+        headers={"cty": "JWT"},
+    )
+    assert codec.decode(foreign_token) == TokenData(
+        **data.model_dump(), token_type=TokenType.access, exp=exp
+    )
+
+
+@pytest.mark.parametrize(
+    "token, error",
+    [
+        ("invalid", jwt.DecodeError),
+        (
+            jwt.encode({}, "", algorithm="none"),
+            jwt.InvalidAlgorithmError,
+        ),
+        (
+            jwt.encode({}, "another_secret", algorithm="HS256"),
+            jwt.InvalidSignatureError,
+        ),
+        (
+            jwt.encode({"exp": 0}, "another_secret", algorithm="HS256"),
+            jwt.InvalidSignatureError,
+        ),
+    ],
+)
+def test_token_codec_invalid(
+    secret_key: str, token: str, error: type[Exception]
+) -> None:
+    with pytest.raises(error):
+        TokenCodec(KeySet("HS256", secret_key)).decode(token)
+
+
+def test_token_codec_expired(secret_key: str) -> None:
+    codec = TokenCodec(KeySet("HS256", secret_key))
+    token = codec.encode(
+        BaseTokenData(user_id=str(ObjectId()), scopes=["user"]),
+        TokenType.access,
+        datetime.now(UTC) - timedelta(seconds=1),
+    )
+    with pytest.raises(jwt.ExpiredSignatureError):
+        codec.decode(token)
+
+
+async def test_introspect(
+    admin_app: AsyncClient, user_app: AsyncClient, user_token_pair: TokenPair
+) -> None:
+    tokens = [
+        user_token_pair.access_token,
+        user_token_pair.refresh_token,
+        "invalid",
+    ]
+    response = await user_app.post("/auth/introspect", json={"tokens": tokens})
+    assert response.status_code == 401, response.json()
+
+    response = await admin_app.post(
+        "/auth/introspect", json={"tokens": tokens}
+    )
+    assert response.status_code == 200, response.json()
+    assert [result["active"] for result in response.json()] == [
+        True,
+        True,
+        False,
+    ]
+    assert TokenData(**response.json()[0]["token_data"]) == decode_token(
+        user_token_pair.access_token
+    )
+
+    await admin_app.post(
+        "/auth/logout", json={"refresh_token": user_token_pair.refresh_token}
+    )
+    response = await admin_app.post(
+        "/auth/introspect", json={"tokens": tokens}
+    )
+    assert response.json()[1]["active"] is False
+    assert response.json()[1]["error"] == "Token is revoked."
+    assert TokenData(**response.json()[1]["token_data"]) == decode_token(
+        user_token_pair.refresh_token
+    )
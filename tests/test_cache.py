@@ -0,0 +1,29 @@
+from app.auth.cache import TTLCache
+
+
+def test_ttl_cache() -> None:
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("a", 1, ttl=-1)
+    assert cache.get("a") is None
+
+    stats = cache.stats()
+    assert (stats.size, stats.hits, stats.misses) == (1, 2, 2)
+
+
+def test_ttl_cache_evict() -> None:
+    cache: TTLCache[tuple[str, str], int] = TTLCache(max_size=3, ttl=60)
+    cache.set(("users", "1"), 1)
+    cache.set(("users", "2"), 2)
+    cache.set(("verifications", "1"), 3)
+
+    cache.evict(lambda key: key[0] == "users")
+    assert len(cache) == 1
+    assert cache.get(("verifications", "1")) == 3
@@ -0,0 +1,34 @@
+import pytest
+from dynaconf import Dynaconf
+from pydantic import ValidationError
+
+from app.auth.config import Config, ExportConfig, config, load_config
+
+
+def test_config_frozen() -> None:
+    with pytest.raises(ValidationError):
+        config.auth.access_token_exp_minutes = 0  # type: ignore[misc]
+
+
+def test_load_config_case_insensitive() -> None:
+    source = Dynaconf(
+        settings_files=[], EXPORT={"BATCH_SIZE": 10, "max_batch_size": 20}
+    )
+    export = load_config(ExportConfig, source.export)
+    assert export == ExportConfig(batch_size=10, max_batch_size=20)
+
+
+def test_load_config_invalid() -> None:
+    data = config.model_dump()
+    data["hashing"]["executor"] = "fiber"
+    data["export"]["batch_size"] = data["export"]["max_batch_size"] + 1
+    del data["mail"]
+
+    with pytest.raises(ValidationError) as exc_info:
+        load_config(Config, Dynaconf(settings_files=[], **data))
+
+    assert {error["loc"] for error in exc_info.value.errors()} == {
+        ("hashing", "executor"),
+        ("export",),
+        ("mail",),
+    }
@@ -0,0 +1,249 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+from pydantic import BaseModel, ValidationError
+from pymongo import IndexModel, monitoring
+from pymongo.errors import DuplicateKeyError
+
+from app.auth.authentication.models import Authorization, token_digest
+from app.auth.authentication.tokens.models import TokenPair
+from app.auth.config import config
+from app.auth.database.migrations import (
+    migrate_authorization_exp_dates,
+    migrate_refresh_token_digests,
+)
+from app.auth.database.monitoring import CommandMonitor, filter_shape
+from app.auth.database.services import Database
+from app.auth.models import ListParams, SortDirection
+from app.auth.metrics import mongo_command_duration
+from app.auth.users.models import User, UserUpdate
+from app.auth.verification.models import Verification
+
+
+async def test_create_indexes(db: Database, user: User) -> None:
+    await db.create_indexes()
+    await db.create_indexes()
+
+    indexes = await db.database[User.collection()].index_information()
+    assert indexes["username_1"]["unique"]
+    assert indexes["email_1"]["unique"]
+
+
+async def test_ttl_indexes(db: Database) -> None:
+    await db.create_indexes()
+
+    for model in (Authorization, Verification):
+        indexes = await db.database[model.collection()].index_information()
+        assert "expireAfterSeconds" in indexes["exp_date_1"]
+
+
+async def test_changed_indexes(
+    db: Database, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    await db.create_indexes()
+    collection = db.database[Authorization.collection()]
+
+    monkeypatch.setattr(
+        Authorization,
+        "indexes",
+        lambda: [
+            IndexModel("refresh_token_digest", unique=True),
+            IndexModel("exp_date", expireAfterSeconds=60),
+        ],
+    )
+    await db.create_indexes()
+
+    indexes = await collection.index_information()
+    assert indexes["exp_date_1"]["expireAfterSeconds"] == 60
+    assert indexes["refresh_token_digest_1"]["unique"]
+
+
+async def test_insert(db: Database, user: User) -> None:
+    document = user.model_copy(update={"id": ObjectId(), "username": "new"})
+
+    inserted = await db.insert(document)
+    read_back = await db.insert(
+        document.model_copy(update={"id": ObjectId()}), read_back=True
+    )
+
+    found = await db.find(User, {"_id": ObjectId(inserted.id)}, True)
+    assert inserted.model_dump(exclude={"created"}) == found.model_dump(
+        exclude={"created"}
+    )
+    assert read_back.username == inserted.username
+
+
+async def test_hydrate_trusted(db: Database, user: User) -> None:
+    document = user.model_dump(by_alias=True) | {
+        "_id": ObjectId(user.id),
+        "email": "not an email",
+    }
+    with pytest.raises(ValidationError):
+        User(**document)
+    with pytest.raises(ValidationError):
+        User.model_validate(document, context={"trusted": True})
+
+    hydrated = db.hydrate(User, document)
+    assert hydrated.id == user.id
+    assert hydrated.email == "not an email"
+
+    await db.database[User.collection()].insert_one(
+        document | {"_id": ObjectId(), "username": "new"}
+    )
+    found = await db.find(User, {"username": "new"}, True)
+    assert isinstance(found.id, str)
+    assert found.roles == user.roles
+
+
+async def test_unique_username(db: Database, user: User) -> None:
+    await db.create_indexes()
+    with pytest.raises(DuplicateKeyError):
+        await db.insert(user.model_copy(update={"id": ObjectId()}))
+
+
+async def test_update(db: Database, user: User) -> None:
+    updated = await db.update(User, user.id, {"username": "new"})
+    assert updated.username == "new"
+    assert updated.password == user.password
+    assert updated.updated
+
+    partial = await db.update(
+        User, user.id, UserUpdate(is_active=False), {"is_active": True}
+    )
+    assert partial == {"_id": ObjectId(user.id), "is_active": False}
+
+
+async def test_update_unset(db: Database, user: User) -> None:
+    class CreatedUpdate(BaseModel):
+        created: datetime | None = None
+        username: str | None = None
+
+    updated = await db.update(User, user.id, CreatedUpdate(created=None))
+    assert updated.created is None
+    assert updated.username == user.username
+
+    assert not UserUpdate(email=None).model_fields_set
+
+
+@pytest.mark.parametrize("direction", list(SortDirection))
+async def test_find_page_nulls(
+    db: Database, user: User, direction: SortDirection
+) -> None:
+    users = [user.model_copy(update={"id": ObjectId()}) for _ in range(3)]
+    for index, document in enumerate(users):
+        document.username = f"page{index}"
+        await db.insert(document)
+    await db.update(User, users[0].id, {"username": "page"})
+    await db.update(User, users[1].id, {"username": "page"})
+
+    ids = []
+    params = ListParams(sort_key="updated", sort_direction=direction, limit=1)
+    while True:
+        page = await db.find_page(User, {}, params)
+        ids += [document.id for document in page.items]
+        if page.next_cursor is None:
+            break
+        params = params.model_copy(update={"cursor": page.next_cursor})
+
+    all_ids = await db.distinct(User, "_id", {})
+    assert sorted(ids) == sorted(str(id) for id in all_ids)
+
+
+async def test_get_cached(db: Database, user: User) -> None:
+    hits = db.cache.stats().hits
+    assert await db.get(User, user.id) is await db.get(User, user.id)
+    assert db.cache.stats().hits == hits + 1
+
+    await db.update(User, user.id, {"username": "new"})
+    assert (await db.get(User, user.id)).username == "new"
+
+
+async def test_migrate_refresh_token_digests(
+    db: Database, user_token_pair: TokenPair
+) -> None:
+    collection = db.database[Authorization.collection()]
+    await collection.update_many(
+        {},
+        {
+            "$set": {"refresh_token": user_token_pair.refresh_token},
+            "$unset": {"refresh_token_digest": ""},
+        },
+    )
+    await collection.create_index("refresh_token")
+
+    assert await migrate_refresh_token_digests(db, batch_size=1) == 1
+    assert await db.find(
+        Authorization,
+        {"refresh_token_digest": token_digest(user_token_pair.refresh_token)},
+    )
+    assert "refresh_token_1" not in await collection.index_information()
+
+
+async def test_migrate_authorization_exp_dates(
+    db: Database, user_token_pair: TokenPair
+) -> None:
+    collection = db.database[Authorization.collection()]
+    legacy = await db.find(Authorization, {}, True)
+    await collection.update_many({}, {"$unset": {"exp_date": ""}})
+
+    assert await migrate_authorization_exp_dates(db, batch_size=1) == 1
+    migrated = await db.find(Authorization, {"_id": ObjectId(legacy.id)}, True)
+    assert legacy.created
+    assert migrated.exp_date.replace(tzinfo=None) == (
+        legacy.created.replace(tzinfo=None)
+        + timedelta(minutes=config.auth.refresh_token_exp_minutes)
+    )
+    assert await migrate_authorization_exp_dates(db) == 0
+
+
+def test_filter_shape() -> None:
+    assert filter_shape(
+        {
+            "$or": [{"username": "user"}, {"email": "a@a.com"}],
+            "_id": {"$in": [ObjectId()]},
+            "is_active": None,
+        }
+    ) == {
+        "$or": [{"username": "?"}, {"email": "?"}],
+        "_id": {"$in": "?"},
+        "is_active": None,
+    }
+
+
+def test_command_monitor(caplog: pytest.LogCaptureFixture) -> None:
+    monitor = CommandMonitor(slow_command_ms=50)
+    address = ("localhost", 27017)
+    for request_id, duration in enumerate([10, 100]):
+        monitor.started(
+            monitoring.CommandStartedEvent(
+                {"find": "monitored", "filter": {"username": "secret"}},
+                "test",
+                request_id,
+                address,
+                None,
+            )
+        )
+        monitor.succeeded(
+            monitoring.CommandSucceededEvent(
+                timedelta(milliseconds=duration),
+                {"ok": 1},
+                "find",
+                request_id,
+                address,
+                None,
+                database_name="test",
+            )
+        )
+
+    assert not monitor.commands
+    assert len(caplog.records) == 1
+    assert "test.monitored took 100.0 ms" in caplog.text
+    assert "{'username': '?'}" in caplog.text
+    assert "secret" not in caplog.text
+
+    metrics = "\n".join(mongo_command_duration.render())
+    assert (
+        'mongo_command_duration_seconds_count{command="find",'
+        'collection="monitored",status="ok"} 2'
+    ) in metrics
@@ -0,0 +1,205 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+from typing import AsyncGenerator
+
+import pytest
+
+from app.auth.database.services import Database
+from app.auth.mail.client import SMTPPool
+from app.auth.mail.models import OutboxMessage, OutboxStatus
+from app.auth.mail.services import OutboxWorker, build_email
+
+
+class Sender:
+    def __init__(self, error: Exception | None = None) -> None:
+        self.error = error
+        self.sent: list[OutboxMessage] = []
+
+    async def __call__(self, message: OutboxMessage) -> None:
+        if self.error:
+            raise self.error
+        self.sent.append(message)
+
+
+class SMTPSink:
+    """The minimal SMTP server accepting every message"""
+
+    def __init__(self) -> None:
+        self.connections = 0
+        self.messages: list[bytes] = []
+        self.writers: list[asyncio.StreamWriter] = []
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        self.writers.append(writer)
+        writer.write(b"220 sink\r\n")
+        while line := await reader.readline():
+            command = line[:4].upper()
+            if command == b"EHLO":
+                writer.write(b"250 sink\r\n")
+            elif command == b"DATA":
+                writer.write(b"354 go on\r\n")
+                data = b""
+                while (line := await reader.readline()) != b".\r\n":
+                    data += line
+                self.messages.append(data)
+                writer.write(b"250 queued\r\n")
+            elif command == b"QUIT":
+                writer.write(b"221 bye\r\n")
+                await writer.drain()
+                break
+            else:
+                writer.write(b"250 ok\r\n")
+            await writer.drain()
+        writer.close()
+
+    def disconnect(self) -> None:
+        for writer in self.writers:
+            writer.close()
+
+
+@pytest.fixture
+async def smtp_sink() -> AsyncGenerator[tuple[SMTPSink, int], None]:
+    sink = SMTPSink()
+    server = await asyncio.start_server(sink.handle, "127.0.0.1", 0)
+    yield sink, server.sockets[0].getsockname()[1]
+    server.close()
+
+
+def outbox_message(email: str = "test@test.com") -> OutboxMessage:
+    return OutboxMessage(recipients=[email], subject="subject", body="body")
+
+
+def outbox_worker(
+    db: Database, sender: Sender, max_attempts: int = 3
+) -> OutboxWorker:
+    return OutboxWorker(db, sender, 10, 0.1, 60, max_attempts, 10, 60)
+
+
+@pytest.fixture
+async def message(db: Database, email: str) -> OutboxMessage:
+    return await db.insert(outbox_message(email))
+
+
+async def test_deliver(db: Database, message: OutboxMessage) -> None:
+    sender = Sender()
+    worker = outbox_worker(db, sender)
+    assert await worker.process_batch() == 1
+    assert [sent.id for sent in sender.sent] == [message.id]
+
+    delivered = await db.get(OutboxMessage, message.id)
+    assert delivered.status == OutboxStatus.sent
+    assert delivered.attempts == 1
+    assert delivered.sent_date
+
+    assert await worker.process_batch() == 0
+
+
+async def test_retry_with_backoff(
+    db: Database, message: OutboxMessage
+) -> None:
+    worker = outbox_worker(db, Sender(ConnectionError("refused")))
+    assert await worker.process_batch() == 1
+
+    failed = await db.get(OutboxMessage, message.id)
+    assert failed.status == OutboxStatus.pending
+    assert failed.attempts == 1
+    assert failed.last_error == "ConnectionError: refused"
+    assert failed.next_attempt > datetime.utcnow() + timedelta(seconds=5)
+
+    # Not due until the backoff is over
+    assert await worker.process_batch() == 0
+
+    assert worker.backoff(1) == timedelta(seconds=10)
+    assert worker.backoff(3) == timedelta(seconds=40)
+    assert worker.backoff(10) == timedelta(seconds=60)
+
+
+async def test_max_attempts(db: Database, message: OutboxMessage) -> None:
+    worker = outbox_worker(db, Sender(ConnectionError()), max_attempts=1)
+    await worker.process_batch()
+
+    failed = await db.get(OutboxMessage, message.id)
+    assert failed.status == OutboxStatus.failed
+
+
+async def test_expired_lease(db: Database, message: OutboxMessage) -> None:
+    worker = outbox_worker(db, Sender())
+    (claimed,) = await worker.claim()
+    assert await worker.claim() == []
+
+    await db.update(
+        OutboxMessage,
+        message.id,
+        {"next_attempt": datetime.now(UTC) - timedelta(seconds=1)},
+    )
+    (reclaimed,) = await worker.claim()
+    assert reclaimed.claim_id != claimed.claim_id
+
+    # The stale claim does not overwrite the state of the new one
+    await worker.deliver(claimed)
+    assert (
+        await db.get(OutboxMessage, message.id)
+    ).status == OutboxStatus.sending
+
+
+async def test_worker_wakeup(db: Database, email: str) -> None:
+    sender = Sender()
+    worker = outbox_worker(db, sender)
+    worker.poll_interval = 60
+    worker.start()
+    await asyncio.sleep(0)
+
+    message = await db.insert(outbox_message(email))
+    worker.wakeup()
+    for _ in range(100):
+        if sender.sent:
+            break
+        await asyncio.sleep(0.01)
+    await worker.stop()
+
+    assert [sent.id for sent in sender.sent] == [message.id]
+
+
+async def test_smtp_pool_reuses_connection(
+    smtp_sink: tuple[SMTPSink, int]
+) -> None:
+    sink, port = smtp_sink
+    pool = SMTPPool("127.0.0.1", port, pool_size=2)
+
+    await asyncio.gather(
+        *(pool.send(build_email(outbox_message())) for _ in range(10))
+    )
+    assert len(sink.messages) == 10
+    assert sink.connections == 2
+
+    await pool.close()
+
+
+async def test_smtp_pool_max_messages(smtp_sink: tuple[SMTPSink, int]) -> None:
+    sink, port = smtp_sink
+    pool = SMTPPool("127.0.0.1", port, max_messages=3)
+
+    for _ in range(4):
+        await pool.send(build_email(outbox_message()))
+    assert len(sink.messages) == 4
+    assert sink.connections == 2
+
+    await pool.close()
+
+
+async def test_smtp_pool_reconnects(smtp_sink: tuple[SMTPSink, int]) -> None:
+    sink, port = smtp_sink
+    pool = SMTPPool("127.0.0.1", port)
+
+    await pool.send(build_email(outbox_message()))
+    sink.disconnect()
+    await asyncio.sleep(0.01)
+
+    await pool.send(build_email(outbox_message()))
+    assert len(sink.messages) == 2
+    assert sink.connections == 2
+
+    await pool.close()
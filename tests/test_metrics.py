@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+from httpx import AsyncClient
+
+from app import auth
+from app.auth.authentication.models import LoginData
+from app.auth.config import config
+from app.auth.database.services import Database
+from app.auth.metrics import Counter, Histogram, db_operation_duration
+from app.auth.users.models import User
+
+
+def test_histogram() -> None:
+    histogram = Histogram("test_seconds", "Test.", ("op",), (0.1, 1.0))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.1, "a")
+    histogram.observe(5, "a")
+
+    assert list(histogram.render()) == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{op="a",le="0.1"} 2',
+        'test_seconds_bucket{op="a",le="1.0"} 2',
+        'test_seconds_bucket{op="a",le="+Inf"} 3',
+        'test_seconds_sum{op="a"} 5.15',
+        'test_seconds_count{op="a"} 3',
+    ]
+
+
+def test_histogram_threads() -> None:
+    histogram = Histogram("test_seconds", "Test.", ("op",), (0.1, 1.0))
+
+    def observe() -> None:
+        for _ in range(10_000):
+            histogram.observe(0.5, "a")
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert list(histogram.render())[-1] == 'test_seconds_count{op="a"} 40000'
+
+
+def test_counter() -> None:
+    counter = Counter("test_total", "Test.", ("name",))
+    counter.inc('a"b')
+    counter.inc('a"b')
+    assert list(counter.render())[-1] == 'test_total{name="a\\"b"} 2'
+
+
+async def test_metrics(
+    admin_app: AsyncClient, user: User, login_data: LoginData
+) -> None:
+    await admin_app.get(f"/users/{user.id}")
+    await admin_app.post(
+        "/auth/login",
+        json={"username": login_data.username, "password": "wrong"},
+    )
+
+    response = await admin_app.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    for series in [
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/users/{user_id}",status="200"}',
+        'db_operation_duration_seconds_count{operation="find",'
+        'collection="users"}',
+        'password_hashing_duration_seconds_count{operation="verify"}',
+        'token_duration_seconds_count{operation="decode"}',
+        'exceptions_total{exception="PasswordError"}',
+    ]:
+        assert series in response.text
+
+
+async def test_metrics_token(
+    app: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monitoring = config.monitoring.model_copy(
+        update={"metrics_token": "secret"}
+    )
+    monkeypatch.setattr(
+        auth, "config", config.model_copy(update={"monitoring": monitoring})
+    )
+
+    response = await app.get("/metrics")
+    assert response.status_code == 401
+
+    response = await app.get(
+        "/metrics", headers={"Authorization": "Bearer secret"}
+    )
+    assert response.status_code == 200
+
+
+async def test_observe_db_keywords(db: Database, user: User) -> None:
+    def count() -> int:
+        series = db_operation_duration.series.get(("find", "users"))
+        return sum(series.counts) if series else 0
+
+    before = count()
+    await db.find(model=User, query={"username": user.username})
+    assert count() == before + 1
@@ -1,71 +1,282 @@
-from fastapi.encoders import jsonable_encoder
-from httpx import AsyncClient
-
-from app.auth.database.services import Database
-from app.auth.users.models import User, UserCreate, UserUpdate
-
-
-async def test_retrieve(admin_app: AsyncClient, user: User) -> None:
-    response = await admin_app.get(f"/users/{user.id}")
-    assert response.status_code == 200, response.json()
-
-
-async def test_retrieve_username(admin_app: AsyncClient, user: User) -> None:
-    response = await admin_app.get(f"/users/username/{user.username}")
-    assert response.status_code == 200, response.json()
-
-
-async def test_retrieve_email(admin_app: AsyncClient, user: User) -> None:
-    response = await admin_app.get(f"/users/email/{user.email}")
-    assert response.status_code == 200, response.json()
-
-
-async def test_list(admin_app: AsyncClient, user: User) -> None:
-    response = await admin_app.get("/users/")
-    assert response.status_code == 200, response.json()
-    assert len(response.json()) == 2
-
-
-async def test_list_by_name(admin_app: AsyncClient, user: User) -> None:
-    response = await admin_app.get(
-        "/users/", params={"username": user.username}
-    )
-    assert response.status_code == 200, response.json()
-    assert len(response.json()) == 1
-
-    response = await admin_app.get(
-        "/users/", params={"username": "incorrect_username"}
-    )
-    assert not len(response.json())
-
-
-async def test_user_create(
-    admin_app: AsyncClient, user_create: UserCreate
-) -> None:
-    response = await admin_app.post(
-        "/users/create", json=jsonable_encoder(user_create)
-    )
-    assert response.status_code == 201, response.json()
-    assert User(**response.json())
-
-
-async def test_user_update_roles(
-    admin_app: AsyncClient, user: User, user_update_roles: UserUpdate
-) -> None:
-    assert user.roles[0] == "user"
-    response = await admin_app.patch(
-        f"/users/{user.id}", json=jsonable_encoder(user_update_roles)
-    )
-    assert response.status_code == 200, response.json()
-    user = User(**response.json())
-    assert user.roles[0] == "admin"
-
-
-async def test_user_delete(
-    admin_app: AsyncClient, user: User, db: Database
-) -> None:
-    response = await admin_app.delete(f"/users/{user.id}")
-    assert response.status_code == 204
-    assert not response.content
-    deleted_user = await db.find(User, {"username": user.username})
-    assert deleted_user is None
+import json
+from typing import Any
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from httpx import AsyncClient
+
+from app.auth.authentication.tokens.models import TokenPair
+from app.auth.authentication.utils import verify_password
+from app.auth.database.services import Database
+from app.auth.models import BulkUpdateResult
+from app.auth.users.models import (
+    BulkCreateResult,
+    User,
+    UserCreate,
+    UserUpdate,
+)
+
+
+async def test_retrieve(admin_app: AsyncClient, user: User) -> None:
+    response = await admin_app.get(f"/users/{user.id}")
+    assert response.status_code == 200, response.json()
+
+
+async def test_retrieve_username(admin_app: AsyncClient, user: User) -> None:
+    response = await admin_app.get(f"/users/username/{user.username}")
+    assert response.status_code == 200, response.json()
+
+
+async def test_retrieve_username_case_insensitive(
+    admin_app: AsyncClient, user: User
+) -> None:
+    response = await admin_app.get(
+        f"/users/username/{user.username.upper()}"
+    )
+    assert response.status_code == 200, response.json()
+    assert response.json()["username"] == user.username
+
+
+async def test_retrieve_email(admin_app: AsyncClient, user: User) -> None:
+    response = await admin_app.get(f"/users/email/{user.email}")
+    assert response.status_code == 200, response.json()
+
+
+async def test_list(admin_app: AsyncClient, user: User) -> None:
+    response = await admin_app.get("/users/")
+    assert response.status_code == 200, response.json()
+    assert len(response.json()["items"]) == 2
+    assert response.json()["next_cursor"] is None
+
+
+async def test_list_pages(admin_app: AsyncClient, user: User) -> None:
+    usernames = []
+    params: dict[str, str | int] = {
+        "sort_key": "username",
+        "sort_direction": 1,
+        "limit": 1,
+    }
+    for _ in range(2):
+        response = await admin_app.get("/users/", params=params)
+        assert response.status_code == 200, response.json()
+        page = response.json()
+        assert len(page["items"]) == 1
+        usernames.append(page["items"][0]["username"])
+        params["cursor"] = page["next_cursor"]
+
+    assert usernames == ["admin", "user"]
+
+    response = await admin_app.get("/users/", params=params)
+    assert response.json() == {"items": [], "next_cursor": None}
+
+
+async def test_list_invalid_cursor(admin_app: AsyncClient) -> None:
+    response = await admin_app.get("/users/", params={"cursor": "invalid"})
+    assert response.status_code == 422
+
+
+async def test_list_by_name(admin_app: AsyncClient, user: User) -> None:
+    response = await admin_app.get(
+        "/users/", params={"username": user.username}
+    )
+    assert response.status_code == 200, response.json()
+    assert len(response.json()["items"]) == 1
+
+    response = await admin_app.get(
+        "/users/", params={"username": user.username[:2]}
+    )
+    assert [user["username"] for user in response.json()["items"]] == [
+        user.username
+    ]
+
+    response = await admin_app.get(
+        "/users/", params={"username": "incorrect_username"}
+    )
+    assert not len(response.json()["items"])
+
+
+async def test_export(admin_app: AsyncClient, user: User) -> None:
+    response = await admin_app.get("/users/export", params={"batch_size": 1})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+
+    users = [json.loads(line) for line in response.text.splitlines()]
+    assert {user["username"] for user in users} == {"admin", "user"}
+    assert all("password" not in user for user in users)
+
+    response = await admin_app.get(
+        "/users/export", params={"fields": ["username"]}
+    )
+    assert set(json.loads(response.text.splitlines()[0])) == {
+        "_id",
+        "username",
+    }
+
+
+async def test_user_create(
+    admin_app: AsyncClient, user_create: UserCreate
+) -> None:
+    response = await admin_app.post(
+        "/users/create", json=jsonable_encoder(user_create)
+    )
+    assert response.status_code == 201, response.json()
+    assert User(**response.json())
+
+
+async def test_user_update_roles(
+    admin_app: AsyncClient, user: User, user_update_roles: UserUpdate
+) -> None:
+    assert user.roles[0] == "user"
+    response = await admin_app.patch(
+        f"/users/{user.id}", json=jsonable_encoder(user_update_roles)
+    )
+    assert response.status_code == 200, response.json()
+    user = User(**response.json())
+    assert user.roles[0] == "admin"
+
+
+async def test_user_delete(
+    admin_app: AsyncClient, user: User, db: Database
+) -> None:
+    response = await admin_app.delete(f"/users/{user.id}")
+    assert response.status_code == 204
+    assert not response.content
+    deleted_user = await db.find(User, {"username": user.username})
+    assert deleted_user is None
+
+
+async def test_cache_stats(admin_app: AsyncClient, user: User) -> None:
+    await admin_app.get(f"/users/{user.id}")
+    await admin_app.get(f"/users/{user.id}")
+
+    response = await admin_app.get("/users/cache/stats")
+    assert response.status_code == 200, response.json()
+    assert response.json()["hits"] >= 1
+
+
+async def test_create_users_bulk(
+    admin_app: AsyncClient,
+    db: Database,
+    admin: User,
+    user_create: UserCreate,
+    plain_password: str,
+) -> None:
+    await db.create_indexes()
+    users_create = [
+        user_create.model_copy(
+            update={
+                "username": f"bulk{index}",
+                "email": f"bulk{index}@test.com",
+                "password": plain_password,
+            }
+        )
+        for index in range(5)
+    ]
+    users_create[1] = users_create[1].model_copy(
+        update={"username": admin.username}
+    )
+    users_create[4] = users_create[4].model_copy(
+        update={"email": users_create[3].email}
+    )
+
+    response = await admin_app.post(
+        "/users/bulk", json=jsonable_encoder(users_create)
+    )
+    assert response.status_code == 200, response.json()
+    results = [BulkCreateResult(**result) for result in response.json()]
+    assert [result.error is None for result in results] == [
+        True,
+        False,
+        True,
+        True,
+        False,
+    ]
+    assert results[1].error and results[1].error.endswith("already exists.")
+
+    assert results[0].user
+    created = await db.get(User, results[0].user.id)
+    assert created.username == "bulk0"
+    assert await verify_password(plain_password, created.password)
+
+
+async def test_update_users_bulk(
+    admin_app: AsyncClient, db: Database, admin: User, user: User
+) -> None:
+    assert (await db.get(User, user.id)).is_active
+
+    response = await admin_app.patch(
+        "/users/bulk",
+        json={
+            "filter": {"roles": ["user"], "is_active": True},
+            "update": {"is_active": False},
+        },
+    )
+    assert response.status_code == 200, response.json()
+    assert BulkUpdateResult(**response.json()) == BulkUpdateResult(
+        matched=2, modified=2
+    )
+    assert not (await db.get(User, user.id)).is_active
+
+
+async def test_update_users_bulk_roles(
+    admin_app: AsyncClient, db: Database, user: User
+) -> None:
+    response = await admin_app.patch(
+        "/users/bulk",
+        json={"filter": {"ids": [user.id]}, "add_roles": ["admin"]},
+    )
+    assert response.status_code == 200, response.json()
+    assert (await db.get(User, user.id)).roles == ["user", "admin"]
+
+    response = await admin_app.patch(
+        "/users/bulk",
+        json={"filter": {"ids": [user.id]}, "remove_roles": ["admin"]},
+    )
+    assert response.status_code == 200, response.json()
+    assert (await db.get(User, user.id)).roles == ["user"]
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"filter": {}, "update": {"is_active": True}},
+        {"filter": {"ids": ["invalid"]}, "update": {"is_active": True}},
+        {"filter": {"is_active": False}, "update": {}},
+        {"filter": {"is_active": False}, "update": {"email": "a@a.com"}},
+        {"filter": {"is_active": False}, "update": {"roles": ["admin"]}},
+        {
+            "filter": {"is_active": False},
+            "add_roles": ["admin"],
+            "remove_roles": ["user"],
+        },
+    ],
+)
+async def test_update_users_bulk_invalid(
+    admin_app: AsyncClient, body: dict[str, Any]
+) -> None:
+    response = await admin_app.patch("/users/bulk", json=body)
+    assert response.status_code == 422, response.json()
+
+
+async def test_delete_users_bulk(
+    admin_app: AsyncClient,
+    db: Database,
+    admin: User,
+    user: User,
+    user_token_pair: TokenPair,
+) -> None:
+    await db.get(User, user.id)
+
+    response = await admin_app.request(
+        "DELETE", "/users/bulk", json={"ids": [user.id]}
+    )
+    assert response.status_code == 200, response.json()
+    assert response.json() == {"deleted": 1}
+
+    response = await admin_app.get(f"/users/{user.id}")
+    assert response.status_code == 404
+
+    response = await admin_app.post(
+        "/auth/refresh", json={"refresh_token": user_token_pair.refresh_token}
+    )
+    assert response.status_code == 404